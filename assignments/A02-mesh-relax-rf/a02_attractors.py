@@ -0,0 +1,189 @@
+import numpy as np
+from a02_projectors import BoundaryProjector
+from compas.geometry import Line
+from compas.geometry import Polyline
+from scipy.spatial import cKDTree
+
+
+def _linear(distances: np.ndarray, radius: float) -> np.ndarray:
+    return distances
+
+
+def _clamped(distances: np.ndarray, radius: float) -> np.ndarray:
+    return np.minimum(distances / radius, 1.0)
+
+
+def _smooth(distances: np.ndarray, radius: float) -> np.ndarray:
+    t = np.minimum(distances / radius, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _gaussian(distances: np.ndarray, radius: float) -> np.ndarray:
+    return 1.0 - np.exp(-((distances / radius) ** 2))
+
+
+# Map from falloff name to a function of the distances and the radius. All of them are 0 at the
+# attractor and grow with the distance; except "linear", they reach 1 at about the radius.
+FALLOFFS = {
+    "linear": _linear,
+    "clamped": _clamped,
+    "smooth": _smooth,
+    "gaussian": _gaussian,
+}
+
+
+class Attractor:
+    """
+    Base class of the attractors: a scalar field over space that depends on the distance to some geometry.
+
+    Parameters
+    ----------
+    factor : float, optional
+        The field is ``factor * falloff(distance)``.
+    falloff : str | callable, optional
+        A name from `FALLOFFS`, or a function ``falloff(distances, radius)`` of an array of distances.
+    radius : float, optional
+        The radius of influence, used by the falloff.
+
+    """
+
+    def __init__(self, factor: float = 1.0, falloff="linear", radius: float = 1.0):
+        if not callable(falloff) and falloff not in FALLOFFS:
+            raise ValueError(f"Unknown falloff {falloff!r}, expected a callable or one of {sorted(FALLOFFS)}.")
+        self.factor = factor
+        self.falloff = falloff
+        self.radius = radius
+
+    def distances(self, points: np.ndarray) -> np.ndarray:
+        """Return the distance of every point to the attractor, shape ``(n,)``."""
+        raise NotImplementedError
+
+    def evaluate(self, points) -> np.ndarray:
+        """Return the value of the field at every point, shape ``(n,)``."""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        falloff = self.falloff if callable(self.falloff) else FALLOFFS[self.falloff]
+        return self.factor * falloff(self.distances(points), self.radius)
+
+
+class PointAttractor(Attractor):
+    """
+    Field of the distance to the nearest of many attractor points, looked up in a KD-tree.
+
+    Parameters
+    ----------
+    points : Point | list[Point]
+        One or more attractor points: COMPAS points, lists of coordinates or Rhino points,
+        e.g. straight from a Grasshopper input.
+
+    Other parameters are documented in `Attractor`.
+
+    """
+
+    def __init__(self, points, factor: float = 1.0, falloff="linear", radius: float = 1.0):
+        super().__init__(factor=factor, falloff=falloff, radius=radius)
+        points = np.asarray([_point(point) for point in points] if _is_sequence_of_points(points) else [_point(points)], dtype=float)
+        self.points = points.reshape(-1, 3)
+        self.tree = cKDTree(self.points)
+
+    def distances(self, points: np.ndarray) -> np.ndarray:
+        distances, _ = self.tree.query(points)
+        return distances
+
+
+class CurveAttractor(Attractor):
+    """
+    Field of the distance to the nearest of many attractor curves.
+
+    Every curve is approximated by a polyline. The segments of all polylines are indexed
+    together in the same spatial index as the target boundary of the relaxation (see
+    `BoundaryProjector`), so the closest points of all vertices on all curves are found
+    at once, without a query per vertex or per curve.
+
+    Parameters
+    ----------
+    curves : Curve | list[Curve]
+        One or more attractor curves: polylines, lines, curves with a ``to_polyline`` method
+        such as `NurbsCurve`, or Rhino curves, e.g. straight from a Grasshopper input.
+    resolution : int, optional
+        The number of segments of the polyline of a curve that is neither a polyline nor a line.
+
+    Other parameters are documented in `Attractor`.
+
+    """
+
+    def __init__(self, curves, factor: float = 1.0, falloff="linear", radius: float = 1.0, resolution: int = 64):
+        super().__init__(factor=factor, falloff=falloff, radius=radius)
+        if not isinstance(curves, (list, tuple)):
+            curves = [curves]
+        self.polylines = [_curve_points(curve, resolution) for curve in curves]
+        self.projector = BoundaryProjector.from_polylines(self.polylines)
+
+    def distances(self, points: np.ndarray) -> np.ndarray:
+        closest = self.projector.project_to_polyline(points)
+        return np.linalg.norm(closest - points, axis=1)
+
+
+class AttractorField:
+    """
+    Several attractors combined into one field.
+
+    Parameters
+    ----------
+    attractors : list[Attractor]
+        The attractors to combine.
+    blend : str, optional
+        ``"min"`` to take the smallest value of all attractors at every point, i.e. the
+        nearest attractor wins for the default linear falloff, or ``"sum"`` to add them up.
+
+    """
+
+    BLENDS = ("min", "sum")
+
+    def __init__(self, attractors: list, blend: str = "min"):
+        if blend not in self.BLENDS:
+            raise ValueError(f"Unknown blend {blend!r}, expected one of {self.BLENDS}.")
+        if not attractors:
+            raise ValueError("An AttractorField needs at least one attractor.")
+        self.attractors = list(attractors)
+        self.blend = blend
+
+    def evaluate(self, points) -> np.ndarray:
+        """Return the value of the field at every point, shape ``(n,)``."""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        values = np.array([attractor.evaluate(points) for attractor in self.attractors])
+        return values.min(axis=0) if self.blend == "min" else values.sum(axis=0)
+
+
+def _is_sequence_of_points(points) -> bool:
+    if hasattr(points, "X"):
+        return False
+    first = next(iter(points), None)
+    return first is not None and not np.isscalar(first)
+
+
+def _curve_points(curve, resolution: int) -> list:
+    """Return the points of a polyline that approximates the curve."""
+    if isinstance(curve, Polyline):
+        return [list(point) for point in curve.points]
+    if isinstance(curve, Line):
+        return [list(curve.start), list(curve.end)]
+    if hasattr(curve, "to_polyline"):
+        return [list(point) for point in curve.to_polyline(n=resolution).points]
+    if hasattr(curve, "TryGetPolyline"):
+        # A Rhino curve: its own vertices if it is a polyline, else points at equal arc lengths.
+        is_polyline, polyline = curve.TryGetPolyline()
+        if is_polyline:
+            return [_point(point) for point in polyline]
+        points = [_point(curve.PointAt(t)) for t in curve.DivideByCount(resolution, True)]
+        if curve.IsClosed:
+            points.append(points[0])
+        return points
+    # A sequence of points.
+    return [_point(point) for point in curve]
+
+
+def _point(point) -> list:
+    """Return the coordinates of a COMPAS point, a list of coordinates or a Rhino ``Point3d``."""
+    if hasattr(point, "X"):
+        return [point.X, point.Y, point.Z]
+    return list(point)
@@ -0,0 +1,172 @@
+import numpy as np
+from a02_mesh_relax import MeshRelaxerGoals
+from a02_mesh_relax import project_to_goals
+from a02_relax_engine import MeshNormals
+from a02_relax_engine import MeshTopology
+from a02_relax_engine import RelaxEngine
+from compas.datastructures import Mesh
+from compas.geometry import Vector
+
+
+class BatchRelaxer:
+    """
+    Relax many meshes with the same settings at once.
+
+    The meshes, e.g. the panels of a facade generated one by one with `QuadMesher`, are
+    stacked into one block-structured position array and adjacency (see
+    `MeshTopology.stack`). Every iteration then computes the spring forces, applies the
+    modifiers and moves the vertices once for all meshes together. The goals are applied once
+    per distinct `MeshRelaxerGoals` object, to all meshes that share it, so panels with their
+    own goals still snap to their own surface, boundary and corners. The results are written
+    back to the original meshes at the end.
+
+    Parameters
+    ----------
+    meshes : list[Mesh]
+        The meshes to relax.
+    iterations : int, optional
+        The number of iterations. When tolerances are set, this is the maximum number of iterations.
+    damping : float, optional
+        The damping factor.
+    modifiers : list, optional
+        Modifiers applied to all meshes. They must implement the batched ``apply_batch``
+        interface, which receives this relaxer and the stacked arrays.
+    goals : MeshRelaxerGoals | list[MeshRelaxerGoals], optional
+        One goals object for all meshes, or one per mesh (``None`` for meshes without goals).
+    snap_to_surface : bool, optional
+        Whether to snap to the target surfaces.
+    force_tolerance : float, optional
+        Stop once the residual force of all meshes together is below this value.
+    displacement_tolerance : float, optional
+        Stop once no vertex moves further than this value in one step.
+
+    Attributes
+    ----------
+    topologies : list[MeshTopology]
+        The topology snapshot of every mesh.
+    topology : MeshTopology
+        The stacked topology of all meshes.
+    normals : MeshNormals
+        Cache of the face and vertex normals of all meshes, shared by the modifiers of a step.
+    steps : int
+        The number of steps performed by the last call to :meth:`relax`.
+    residual : float
+        Root mean square of the vertex displacements of the last step, if tolerances are set.
+    max_displacement : float
+        The largest vertex displacement of the last step, if tolerances are set.
+    converged : bool
+        Whether the last call to :meth:`relax` stopped because the tolerances were met.
+
+    """
+
+    def __init__(
+        self,
+        meshes: list[Mesh],
+        iterations: int = 50,
+        damping: float = 0.2,
+        modifiers: list = None,
+        goals=None,
+        snap_to_surface: bool = True,
+        force_tolerance: float = None,
+        displacement_tolerance: float = None,
+    ):
+        self.meshes = list(meshes)
+        self.iterations = iterations
+        self.damping = damping
+        self.modifiers = modifiers or []
+        self.snap_to_surface = snap_to_surface
+        self.force_tolerance = force_tolerance
+        self.displacement_tolerance = displacement_tolerance
+
+        if goals is None or isinstance(goals, MeshRelaxerGoals):
+            goals = [goals] * len(self.meshes)
+        if len(goals) != len(self.meshes):
+            raise ValueError(f"Expected one MeshRelaxerGoals per mesh, got {len(goals)} for {len(self.meshes)} meshes.")
+        self.goals = list(goals)
+
+        for modifier in self.modifiers:
+            if not hasattr(modifier, "apply_batch"):
+                raise ValueError(f"{type(modifier).__name__} has no apply_batch method, which the BatchRelaxer needs.")
+
+        self.steps = 0
+        self.residual = None
+        self.max_displacement = None
+        self.converged = False
+
+        for mesh in self.meshes:
+            for vertex in mesh.vertices():
+                mesh.vertex_attribute(vertex, "fixed", False)
+        self.invalidate_topology()
+
+    def invalidate_topology(self) -> None:
+        """Rebuild the topology snapshots, e.g. after changing the connectivity of a mesh in place."""
+        self.topologies = [MeshTopology(mesh) for mesh in self.meshes]
+        self.topology = MeshTopology.stack(self.topologies)
+        self.normals = MeshNormals(self.topology)
+
+        # Rows of the meshes that share a goals object, so every goals object is applied once per step.
+        rows_by_goals = {}
+        for index, goals in enumerate(self.goals):
+            if goals is None:
+                continue
+            rows = np.arange(self.topology.offsets[index], self.topology.offsets[index + 1])
+            rows_by_goals.setdefault(id(goals), (goals, []))[1].append(rows)
+        self._goal_groups = []
+        for goals, rows in rows_by_goals.values():
+            mask = np.zeros(self.topology.vertex_count, dtype=bool)
+            mask[np.concatenate(rows)] = True
+            self._goal_groups.append((goals, mask))
+
+    @property
+    def tracks_convergence(self) -> bool:
+        return self.force_tolerance is not None or self.displacement_tolerance is not None
+
+    def relax(self) -> list[Mesh]:
+        """Relax all meshes and return them."""
+        if any([topology.refresh_fixed(mesh) for mesh, topology in zip(self.meshes, self.topologies)]):
+            self.topology.set_fixed(np.concatenate([topology.fixed for topology in self.topologies]))
+        engine = RelaxEngine.stack(self.meshes, self.topologies, self.topology)
+        self.steps = 0
+        self.converged = False
+
+        for _ in range(self.iterations):
+            previous_positions = engine.positions.copy() if self.tracks_convergence else None
+
+            engine.compute_forces(self.damping)
+            for modifier in self.modifiers:
+                modifier.apply_batch(self, engine.positions, engine.forces, engine.topology.modifier_mask)
+            engine.apply_forces()
+            self._apply_goals(engine)
+            self.steps += 1
+
+            if previous_positions is None:
+                continue
+
+            displacements = np.linalg.norm(engine.positions - previous_positions, axis=1)
+            self.residual = float(np.sqrt(np.mean(displacements**2))) if len(displacements) else 0.0
+            self.max_displacement = float(displacements.max()) if len(displacements) else 0.0
+            if (self.force_tolerance is None or self.residual <= self.force_tolerance) and (
+                self.displacement_tolerance is None or self.max_displacement <= self.displacement_tolerance
+            ):
+                self.converged = True
+                break
+
+        self._write_back(engine)
+        return self.meshes
+
+    def _apply_goals(self, engine: RelaxEngine) -> None:
+        topology = engine.topology
+        free = ~topology.fixed
+        # The stacked rows are unique across the meshes, unlike the vertex keys.
+        keys = np.arange(topology.vertex_count)
+        for goals, mask in self._goal_groups:
+            project_to_goals(goals, engine.positions, topology, free & mask, keys, self.snap_to_surface)
+
+    def _write_back(self, engine: RelaxEngine) -> None:
+        offsets = self.topology.offsets
+        for index, (mesh, topology) in enumerate(zip(self.meshes, self.topologies)):
+            positions = engine.positions[offsets[index] : offsets[index + 1]].tolist()
+            forces = engine.forces[offsets[index] : offsets[index + 1]].tolist()
+            for vertex, xyz, force in zip(topology.vertices, positions, forces):
+                mesh.vertex_attributes(vertex, "xyz", xyz)
+                mesh.vertex_attribute(vertex, "force", Vector(*force))
@@ -1,3 +1,17 @@
+import time
+from bisect import bisect_right
+from itertools import count
+
+import numpy as np
+from a02_profiling import RelaxProfiler
+from a02_projectors import BoundaryProjector
+from a02_projectors import PlanarityProjector
+from a02_projectors import SurfaceProjector
+from a02_relax_engine import ImplicitSolver
+from a02_relax_engine import MeshNormals
+from a02_relax_engine import MeshTopology
+from a02_relax_engine import RelaxEngine
+from a02_trajectory import TrajectoryRecorder
 from compas.datastructures import Mesh
 from compas.geometry import NurbsSurface
 from compas.geometry import Point
@@ -19,12 +33,62 @@ class MeshRelaxerGoals:
     target_surface
         Optional surface object (must provide ``closest_point``) used
         when snapping centerline endpoints to a surface.
+    surface_projector : SurfaceProjector
+        Batched projector onto ``target_surface``, used by the array engines of the relaxer.
+        It is built on first access and kept, together with the UV parameters of the
+        projected vertices, for as long as ``target_surface`` does not change.
+    boundary_projector : BoundaryProjector
+        Batched projector onto ``target_boundary`` and ``target_corners``, used by the array
+        engines of the relaxer. It is built on first access and kept for as long as
+        ``target_boundary`` and ``target_corners`` do not change.
+    planarity
+        Optional strength (between 0 and 1) of the pull of the face vertices towards the
+        best-fit planes of their faces, e.g. for fabrication-ready planar quads.
+    planarity_projector : PlanarityProjector
+        Batched projector onto the face planes. After every step, its ``deviations``
+        hold the planarity deviation of every face.
     """
 
-    def __init__(self, target_boundary: Polyline = None, target_corners: list[Point] = None, target_surface: NurbsSurface = None):
+    def __init__(
+        self,
+        target_boundary: Polyline = None,
+        target_corners: list[Point] = None,
+        target_surface: NurbsSurface = None,
+        planarity: float = None,
+    ):
         self.target_boundary = target_boundary
         self.target_corners = target_corners
         self.target_surface = target_surface
+        self.planarity = planarity
+        self._surface_projector = None
+        self._boundary_projector = None
+        self._planarity_projector = None
+
+    @property
+    def surface_projector(self) -> SurfaceProjector:
+        if self.target_surface is None:
+            return None
+        if self._surface_projector is None or self._surface_projector.surface is not self.target_surface:
+            self._surface_projector = SurfaceProjector(self.target_surface)
+        return self._surface_projector
+
+    @property
+    def boundary_projector(self) -> BoundaryProjector:
+        if not self.target_boundary and not self.target_corners:
+            return None
+        projector = self._boundary_projector
+        if projector is None or projector.polyline is not self.target_boundary or projector.corners is not self.target_corners:
+            self._boundary_projector = BoundaryProjector(self.target_boundary, self.target_corners)
+        return self._boundary_projector
+
+    @property
+    def planarity_projector(self) -> PlanarityProjector:
+        if not self.planarity:
+            return None
+        if self._planarity_projector is None:
+            self._planarity_projector = PlanarityProjector(self.planarity)
+        self._planarity_projector.strength = self.planarity
+        return self._planarity_projector
 
     @classmethod
     def from_brep(cls, brep) -> "MeshRelaxerGoals":
@@ -40,6 +104,38 @@ class MeshRelaxerGoals:
         return cls(target_boundary=target_boundary, target_corners=target_corners, target_surface=target_surface)
 
 
+class RelaxationState:
+    """
+    Snapshot of the end of a relaxation, used to warm-start the next one.
+
+    Parameters
+    ----------
+    topology : MeshTopology
+        The topology snapshot of the relaxed mesh.
+    positions : numpy.ndarray
+        The relaxed vertex coordinates, shape ``(n, 3)``, in the vertex order of the topology.
+    step : int
+        The total number of steps performed until this state.
+    surface_keys : numpy.ndarray, optional
+        The vertices with remembered surface parameters.
+    surface_parameters : numpy.ndarray, optional
+        The UV parameters of the projections of ``surface_keys`` onto the target surface.
+
+    """
+
+    def __init__(self, topology: MeshTopology, positions: np.ndarray, step: int, surface_keys: np.ndarray = None, surface_parameters: np.ndarray = None):
+        self.fingerprint = topology.fingerprint
+        self.vertex_keys = topology.vertex_keys
+        self.positions = positions
+        self.step = step
+        self.surface_keys = surface_keys
+        self.surface_parameters = surface_parameters
+
+    def matches(self, topology: MeshTopology) -> bool:
+        """Return True if the state belongs to a mesh with this topology."""
+        return self.fingerprint == topology.fingerprint and np.array_equal(self.vertex_keys, topology.vertex_keys)
+
+
 class MeshRelaxer:
     """
     Relax a mesh by moving its vertices to their average position of their neighbors.
@@ -49,15 +145,48 @@ class MeshRelaxer:
     mesh : Mesh
         The mesh to relax.
     iterations : int, optional
-        The number of iterations to perform.
+        The number of iterations to perform. When tolerances or a time budget are set,
+        this is the maximum number of iterations. ``None`` for no limit, which needs a time budget.
     damping : float, optional
         The damping factor.
     modifiers : list, optional
-        A list of modifiers to apply during the relaxation.
+        A list of modifiers to apply during the relaxation. With the array engines,
+        modifiers that provide ``apply_batch`` are applied on the packed arrays.
     goals : MeshRelaxerGoals, optional
         The goals for the relaxation.
     snap_to_surface : bool, optional
         Whether to snap to the surface.
+    engine : str, optional
+        ``"mesh"`` runs every step vertex by vertex through the `Mesh` API.
+        ``"numpy"`` packs the mesh into arrays once, runs every step as vectorized
+        array operations and writes the coordinates back to the mesh at the end.
+        ``"implicit"`` works on the same arrays, but moves the interior vertices with an
+        implicit Laplacian smoothing step (a sparse solve), which stays stable for large steps.
+        Boundary vertices constrained by the goals, corners and fixed vertices are eliminated
+        from the solve and move with the explicit forces instead.
+    implicit_step : float, optional
+        The time step of the implicit engine. Larger values smooth more per step.
+    force_tolerance : float, optional
+        Stop once the residual force is below this value.
+    displacement_tolerance : float, optional
+        Stop once no vertex moves further than this value in one step.
+    adaptive_damping : bool, optional
+        Whether to adapt the damping of the spring forces between steps: it is reduced
+        when the residual grows (oscillation) and increased when it barely shrinks (slow creep).
+    warm_start : RelaxationState, optional
+        The ``state`` of an earlier relaxer of the same mesh to resume from, e.g. kept in
+        ``scriptcontext.sticky`` between Grasshopper solutions. Combined with a tolerance,
+        small changes of the goals or modifiers then settle in a few iterations.
+    recorder : TrajectoryRecorder, optional
+        Records the vertex positions (and optionally forces) of every ``stride``-th step,
+        e.g. to scrub through the relaxation without keeping a copy of the mesh per step.
+    profiler : RelaxProfiler, optional
+        Times every phase of every step and every modifier class.
+        Without a profiler, the steps run without any timing.
+    time_budget : float, optional
+        Wall-clock budget of every call to :meth:`relax`, in seconds. The relaxation runs as
+        many steps as fit into the budget and returns the current state; the next call
+        continues from there. Useful for responsive previews of large meshes in Grasshopper.
 
     Attributes
     ----------
@@ -73,15 +202,61 @@ class MeshRelaxer:
         The goals for the relaxation.
     snap_to_surface : bool
         Whether to snap to the surface.
-    snap_to_surface : bool
-        Whether to snap to the surface.
+    engine : str
+        The relaxation engine, ``"mesh"``, ``"numpy"`` or ``"implicit"``.
+    implicit_step : float
+        The time step of the implicit engine.
+    force_tolerance : float
+        The residual force below which the relaxation stops.
+    displacement_tolerance : float
+        The vertex displacement below which the relaxation stops.
+    adaptive_damping : bool
+        Whether the damping is adapted between steps.
+    step : int
+        The total number of steps performed by this relaxer.
+    steps : int
+        The number of steps performed by the last call to :meth:`relax`.
+    residual : float
+        Root mean square of the effective vertex forces of the last step, i.e. of the
+        vertex displacements once the goals have removed the constrained components.
+    max_displacement : float
+        The largest vertex displacement of the last step.
+    converged : bool
+        Whether the last call to :meth:`relax` stopped because the tolerances were met.
+    effective_damping : float
+        The damping used by the last step.
+    recorder : TrajectoryRecorder
+        The recorder of the relaxation steps.
+    profiler : RelaxProfiler
+        The profiler of the relaxation steps.
+    time_budget : float
+        The wall-clock budget of every call to :meth:`relax`, in seconds.
+    out_of_time : bool
+        Whether the last call to :meth:`relax` stopped because its time budget was used up.
+    state : RelaxationState
+        The state at the end of the last relaxation, the next call to :meth:`relax` resumes from it.
+    topology : MeshTopology
+        Snapshot of the mesh connectivity, rebuilt only when the connectivity changes.
+        Its fixed mask is re-read from the mesh at the start of every call to :meth:`relax`.
     boundary_vertices : list[int]
         The boundary vertices.
     interior_vertices : list[int]
         The interior vertices.
+    corner_vertices : list[int]
+        The boundary vertices with only two neighbors.
+    normals : MeshNormals
+        Cache of the face and vertex normals, shared by the modifiers of a step.
 
     """
 
+    ENGINES = ("mesh", "numpy", "implicit")
+
+    # Adaptive damping: shrink on oscillation, grow on slow creep, within bounds relative to `damping`.
+    DAMPING_SHRINK = 0.5
+    DAMPING_GROWTH = 1.1
+    DAMPING_CREEP_RATIO = 0.95
+    DAMPING_BOUNDS = (0.01, 10.0)
+
     def __init__(
         self,
         mesh: Mesh,
@@ -90,30 +265,101 @@ class MeshRelaxer:
         modifiers: list = None,
         goals: MeshRelaxerGoals = None,
         snap_to_surface: bool = True,
+        engine: str = "mesh",
+        implicit_step: float = 10.0,
+        force_tolerance: float = None,
+        displacement_tolerance: float = None,
+        adaptive_damping: bool = False,
+        warm_start: RelaxationState = None,
+        recorder: TrajectoryRecorder = None,
+        profiler: RelaxProfiler = None,
+        time_budget: float = None,
     ):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown relaxation engine: {engine}. Use one of {self.ENGINES}.")
+        if iterations is None and time_budget is None:
+            raise ValueError("A MeshRelaxer without an iteration limit needs a time budget.")
+
         self.mesh = mesh
         self.iterations = iterations
         self.damping = damping
         self.goals = goals
         self.modifiers = modifiers or []
         self.snap_to_surface = snap_to_surface
+        self.engine = engine
+        self.implicit_step = implicit_step
+        self.force_tolerance = force_tolerance
+        self.displacement_tolerance = displacement_tolerance
+        self.adaptive_damping = adaptive_damping
 
         self.assigned_vertices = set()
         self.step = 0
+        self.steps = 0
+        self.residual = None
+        self.max_displacement = None
+        self.converged = False
+        self.effective_damping = damping
+        self.state = warm_start
+        self.recorder = recorder
+        self.profiler = profiler
+        self.time_budget = time_budget
+        self.out_of_time = False
+        self._implicit_solver = None
+        self._normals = None
 
         self.set_vertices_default_attributes()
+        self._topology = MeshTopology(self.mesh)
+
+    @property
+    def tracks_convergence(self) -> bool:
+        """Whether every step measures the residual and displacement."""
+        return self.force_tolerance is not None or self.displacement_tolerance is not None or self.adaptive_damping
+
+    @property
+    def topology(self) -> MeshTopology:
+        """Return the topology snapshot, rebuilding it if the mesh connectivity has changed."""
+        if not self._topology.matches(self.mesh):
+            self.invalidate_topology()
+        return self._topology
 
     @property
     def boundary_vertices(self):
         """Return the boundary vertices of the mesh."""
-        bvs = [v for v in self.mesh.vertices() if self.mesh.is_vertex_on_boundary(v)]
-        return bvs
+        return self.topology.keys(self.topology.boundary_indices)
 
     @property
     def interior_vertices(self):
         """Return the interior vertices of the mesh."""
-        ivs = [v for v in self.mesh.vertices() if not self.mesh.is_vertex_on_boundary(v)]
-        return ivs
+        return self.topology.keys(self.topology.interior_indices)
+
+    @property
+    def corner_vertices(self):
+        """Return the boundary vertices with only two neighbors."""
+        return self.topology.keys(self.topology.corner_indices)
+
+    @property
+    def normals(self) -> MeshNormals:
+        """Return the normals cache of the current topology."""
+        if self._normals is None or self._normals.topology is not self.topology:
+            self._normals = MeshNormals(self.topology)
+        return self._normals
+
+    def invalidate_topology(self) -> None:
+        """Rebuild the topology snapshot, e.g. after changing the connectivity of the mesh in place."""
+        self._topology = MeshTopology(self.mesh)
+
+    def _update_topology(self) -> bool:
+        """
+        Update the topology snapshot after a mesh modifier, which changes the connectivity or the fixed vertices.
+
+        The snapshot is only rebuilt if the connectivity changed, otherwise just its fixed mask is re-read.
+        Return True if it was rebuilt.
+        """
+        if self._topology.matches(self.mesh):
+            self._topology.refresh_fixed(self.mesh)
+            return False
+        self.invalidate_topology()
+        return True
 
     def set_vertices_default_attributes(self):
         """Set default attributes for all vertices."""
@@ -124,12 +370,537 @@ class MeshRelaxer:
     # MAIN TASK
     # ========================================================================
 
+    def relax(self, cold_start: bool = False) -> Mesh:
+        """
+        Relax the mesh and return it.
+
+        Runs ``self.iterations`` steps, or stops earlier once the tolerances are met
+        or the next step would exceed the time budget.
+        If the relaxer has a ``state`` of the same topology, the relaxation resumes from its
+        positions, surface parameters and step count instead of the current mesh coordinates.
+
+        Parameters
+        ----------
+        cold_start : bool, optional
+            Discard the state and start from the current mesh coordinates.
+
+        """
+        if cold_start:
+            self.reset_state()
+        elif self.state is not None:
+            self._restore_state(self.state)
+
+        start_time = time.perf_counter()
+        # The fixed vertices are usually set after the constructor reset them.
+        self.topology.refresh_fixed(self.mesh)
+        engine = RelaxEngine(self.mesh, self.topology) if self.engine != "mesh" else None
+
+        damping = self.damping
+        previous_residual = None
+        self.steps = 0
+        self.converged = False
+        self.out_of_time = False
+
+        if self.recorder is not None:
+            self.recorder.start(self.topology.vertex_keys, len(self.recorder) + (self.iterations or 0) // self.recorder.stride + 1)
+            if not len(self.recorder):
+                self._record(engine)
+
+        for _ in range(self.iterations) if self.iterations is not None else count():
+            previous_positions = self._read_positions(engine) if self.tracks_convergence else None
+            topology = self.topology
+            if self.profiler is not None:
+                self.profiler.begin_step(self.step + 1)
+
+            if engine is None:
+                self._step_mesh(damping)
+            elif self.engine == "implicit":
+                self._step_implicit(engine, damping)
+            else:
+                self._step_numpy(engine, damping)
+
+            self.step += 1
+            self.steps += 1
+            self.effective_damping = damping
+
+            if self.profiler is not None:
+                self.profiler.end_step(self)
+
+            if self.recorder is not None and self.recorder.should_record(self.step):
+                self._record(engine)
+
+            if previous_positions is not None and self.topology is not topology:
+                # A mesh modifier changed the connectivity, so the positions before and after this step
+                # cannot be compared: the convergence tracking starts over with the next step.
+                previous_positions = previous_residual = None
+
+            if previous_positions is not None:
+                displacements = np.linalg.norm(self._read_positions(engine) - previous_positions, axis=1)
+                # Normalize by the damping, so that lowering it does not fake convergence.
+                residual = np.sqrt(np.mean(displacements**2)) * self.damping / damping if len(displacements) else 0.0
+                self.residual = float(residual)
+                self.max_displacement = float(displacements.max()) if len(displacements) else 0.0
+
+                if self._tolerances_met():
+                    self.converged = True
+                    break
+
+                if self.adaptive_damping:
+                    damping = self._adapt_damping(damping, previous_residual)
+                previous_residual = self.residual
+
+            if self.time_budget is not None and self._out_of_time(start_time):
+                self.out_of_time = True
+                break
+
+        if engine is not None:
+            engine.write_positions(self.mesh)
+            engine.write_forces(self.mesh)
+
+        self.state = self._capture_state(engine)
+        return self.mesh
+
+    def reset_state(self) -> None:
+        """Forget the state of earlier relaxations, so the next one starts cold."""
+        self.state = None
+        self.step = 0
+        projector = self._state_surface_projector()
+        if projector is not None:
+            projector.forget()
+
+    def _restore_state(self, state: RelaxationState) -> None:
+        topology = self.topology
+        if not state.matches(topology):
+            self.state = None
+            return
+
+        for vertex, xyz in zip(topology.vertices, state.positions.tolist()):
+            self.mesh.vertex_attributes(vertex, "xyz", xyz)
+        self.step = state.step
+
+        projector = self._state_surface_projector()
+        if projector is not None and state.surface_keys is not None:
+            projector.remember(state.surface_keys, state.surface_parameters)
+
+    def _state_surface_projector(self) -> SurfaceProjector:
+        # Only the array engines project through (and build) the surface projector.
+        if self.engine == "mesh" or not self.goals:
+            return None
+        return self.goals.surface_projector
+
+    def _capture_state(self, engine: RelaxEngine = None) -> RelaxationState:
+        surface_keys, surface_parameters = None, None
+        projector = self._state_surface_projector()
+        if projector is not None:
+            surface_keys, surface_parameters = projector.remembered()
+        return RelaxationState(self.topology, self._read_positions(engine), self.step, surface_keys, surface_parameters)
+
+    def _record(self, engine: RelaxEngine = None) -> None:
+        forces = None
+        if self.recorder.record_forces:
+            if engine is not None:
+                forces = engine.forces
+            else:
+                # Before the first step the vertices have no force yet.
+                forces = [list(self.mesh.vertex_attribute(vertex, "force") or [0.0, 0.0, 0.0]) for vertex in self.topology.vertices]
+        self.recorder.record(self.step, self._read_positions(engine), forces)
+
+    def _phase(self, name: str, function, *args):
+        if self.profiler is None:
+            return function(*args)
+        return self.profiler.time_phase(name, function, *args)
+
+    def _run_modifier(self, modifier, function, *args):
+        if self.profiler is None:
+            return function(*args)
+        return self.profiler.time_modifier(modifier, function, *args)
+
+    def _step_mesh(self, damping: float) -> None:
+        self._phase("forces", self.compute_forces, damping)
+        self._phase("modifiers", self.apply_modifiers)
+        self._phase("apply_forces", self.apply_forces)
+        self._phase("goals", self.apply_goals)
+
+    def _read_positions(self, engine: RelaxEngine = None) -> np.ndarray:
+        if engine is not None:
+            return engine.positions.copy()
+        return np.array([self.mesh.vertex_coordinates(vertex) for vertex in self.mesh.vertices()], dtype=float).reshape(-1, 3)
+
+    def _out_of_time(self, start_time: float) -> bool:
+        # Stop if one more step of the average duration so far would exceed the budget.
+        elapsed = time.perf_counter() - start_time
+        return elapsed + elapsed / self.steps > self.time_budget
+
+    def _tolerances_met(self) -> bool:
+        if self.force_tolerance is None and self.displacement_tolerance is None:
+            return False
+        if self.force_tolerance is not None and self.residual > self.force_tolerance:
+            return False
+        if self.displacement_tolerance is not None and self.max_displacement > self.displacement_tolerance:
+            return False
+        return True
+
+    def _adapt_damping(self, damping: float, previous_residual: float) -> float:
+        if previous_residual is None:
+            return damping
+
+        if self.residual > previous_residual:
+            damping *= self.DAMPING_SHRINK
+        elif self.residual > previous_residual * self.DAMPING_CREEP_RATIO:
+            damping *= self.DAMPING_GROWTH
+
+        low, high = self.DAMPING_BOUNDS
+        return min(max(damping, self.damping * low), self.damping * high)
+
+    def compute_forces(self, damping: float = None) -> None:
+        """Store the spring force of every vertex in its ``force`` attribute."""
+        damping = self.damping if damping is None else damping
+
+        for vertex in self.mesh.vertices():
+            neighbors = self.mesh.vertex_neighbors(vertex)
+
+            if not neighbors:
+                continue
+
+            if len(neighbors) == 2:
+                self.mesh.vertex_attribute(vertex, "force", Vector(0, 0, 0))
+                continue
+
+            force = Vector(0, 0, 0)
+            for neighbor in neighbors:
+                neighbor_force = self.mesh.edge_vector((vertex, neighbor))
+                neighbor_force *= self.mesh.edge_length((vertex, neighbor))
+                force += neighbor_force * damping / len(neighbors)
+
+            self.mesh.vertex_attribute(vertex, "force", force)
+
+    def apply_modifiers(self) -> None:
+        """Let every modifier add its contribution to the vertex forces."""
+        for modifier in self.modifiers:
+            self._run_modifier(modifier, modifier.apply, self, self.mesh)
+            if getattr(modifier, "type", None) == "mesh_modifier":
+                self._update_topology()
+
+    def apply_forces(self) -> None:
+        """Move every free vertex by its accumulated force."""
+        topology = self.topology
+        for vertex, fixed in zip(topology.vertices, topology.fixed):
+            if fixed:
+                continue
+
+            force = self.mesh.vertex_attribute(vertex, "force")
+            if force is None:
+                continue
+
+            new_point = self.mesh.vertex_point(vertex) + force
+            self.mesh.vertex_attributes(vertex, "xyz", list(new_point))
+
+    def apply_goals(self) -> None:
+        """Snap the vertices to the target surface, face planes, boundary and corners."""
+        if not self.goals:
+            return
+
+        topology = self.topology
+        free = ~topology.fixed
+
+        if self.snap_to_surface and self.goals.target_surface:
+            for vertex in topology.keys(np.flatnonzero(free)):
+                point = self.goals.target_surface.closest_point(self.mesh.vertex_point(vertex))
+                self.mesh.vertex_attributes(vertex, "xyz", list(point))
+
+        if self.goals.planarity:
+            positions = self.goals.planarity_projector.project(self._read_positions(), topology, free)
+            for vertex, xyz in zip(topology.keys(np.flatnonzero(free)), positions[free].tolist()):
+                self.mesh.vertex_attributes(vertex, "xyz", xyz)
+
+        if self.goals.target_boundary:
+            for vertex in topology.keys(topology.boundary_indices[free[topology.boundary_indices]]):
+                point = closest_point_on_polyline(self.mesh.vertex_point(vertex), self.goals.target_boundary)
+                self.mesh.vertex_attributes(vertex, "xyz", list(point))
+
+        if self.goals.target_corners:
+            for vertex in topology.keys(topology.corner_indices[free[topology.corner_indices]]):
+                point = self.mesh.vertex_point(vertex)
+                corner = min(self.goals.target_corners, key=point.distance_to_point)
+                self.mesh.vertex_attributes(vertex, "xyz", list(corner))
+
+    # ========================================================================
+    # ARRAY ENGINES
+    # ========================================================================
+
+    def _step_numpy(self, engine: RelaxEngine, damping: float) -> None:
+        self._phase("forces", engine.compute_forces, damping)
+        self._phase("modifiers", self._apply_modifiers_to_engine, engine)
+        self._phase("apply_forces", engine.apply_forces)
+        self._phase("goals", self._apply_goals_to_engine, engine)
+
+    def _step_implicit(self, engine: RelaxEngine, damping: float) -> None:
+        topology = engine.topology
+        spring_forces = self._phase("forces", engine.compute_forces, damping).copy()
+        self._phase("modifiers", self._apply_modifiers_to_engine, engine)
+        if engine.topology is not topology:
+            # A mesh modifier changed the connectivity and the engine was re-packed. The vertices that are
+            # left keep their spring forces, and the solver is rebuilt for the new topology.
+            rows = engine.topology.rows_in(topology)
+            spring_forces = np.where(rows[:, None] >= 0, spring_forces[rows], 0.0)
+        self._phase("apply_forces", self._solve_implicit, engine, spring_forces)
+        self._phase("goals", self._apply_goals_to_engine, engine)
+
+    def _solve_implicit(self, engine: RelaxEngine, spring_forces: np.ndarray) -> None:
+        solver = self._get_implicit_solver(engine.topology)
+        external_forces = engine.forces - spring_forces
+
+        # Constrained vertices move explicitly and then act as boundary conditions of the solve.
+        explicit = solver.held[~engine.topology.fixed[solver.held]]
+        engine.positions[explicit] += engine.forces[explicit]
+        solver.solve(engine.positions, external_forces)
+
+    def _get_implicit_solver(self, topology: MeshTopology) -> ImplicitSolver:
+        """Return the implicit solver of the topology, reusing the cached factorization when possible."""
+        constrained = topology.fixed.copy()
+        constrained[topology.corner_indices] = True
+        if self.goals and self.goals.target_boundary:
+            constrained[topology.boundary_indices] = True
+
+        solver = self._implicit_solver
+        if solver is None or not solver.matches(topology, constrained, self.implicit_step):
+            solver = self._implicit_solver = ImplicitSolver(topology, constrained, self.implicit_step)
+        return solver
+
+    def _apply_modifiers_to_engine(self, engine: RelaxEngine) -> None:
+        for modifier in self.modifiers:
+            if hasattr(modifier, "apply_batch"):
+                self._run_modifier(modifier, modifier.apply_batch, self, engine.positions, engine.forces, engine.topology.modifier_mask)
+                continue
+
+            # Modifiers without a batched interface read and write the mesh,
+            # so it has to be in sync before and after.
+            engine.write_positions(self.mesh)
+            engine.write_forces(self.mesh)
+            self._run_modifier(modifier, modifier.apply, self, self.mesh)
+            if getattr(modifier, "type", None) == "mesh_modifier" and self._update_topology():
+                engine.reset(self.mesh, self.topology)
+            engine.read_forces(self.mesh)
+
+    def _apply_goals_to_engine(self, engine: RelaxEngine) -> None:
+        if not self.goals:
+            return
+
+        topology = engine.topology
+        project_to_goals(self.goals, engine.positions, topology, ~topology.fixed, topology.vertex_keys, self.snap_to_surface)
+
+
+def project_to_goals(goals: MeshRelaxerGoals, positions: np.ndarray, topology: MeshTopology, free: np.ndarray, keys: np.ndarray, snap_to_surface: bool = True) -> None:
+    """
+    Snap the free rows of a packed position array to the goals, in place.
+
+    Parameters
+    ----------
+    goals : MeshRelaxerGoals
+        The goals.
+    positions : numpy.ndarray
+        The vertex positions, shape ``(n, 3)``.
+    topology : MeshTopology
+        The topology snapshot of the positions.
+    free : numpy.ndarray
+        Boolean mask of the rows to snap.
+    keys : numpy.ndarray
+        Unique integer keys of the rows, under which the surface projector remembers their parameters.
+    snap_to_surface : bool, optional
+        Whether to snap to the target surface.
+
+    """
+    if snap_to_surface and goals.target_surface:
+        rows = np.flatnonzero(free)
+        positions[rows] = goals.surface_projector.project(positions[rows], keys=keys[rows])
+
+    if goals.planarity:
+        goals.planarity_projector.project(positions, topology, free, out=positions)
+
+    if goals.target_boundary or goals.target_corners:
+        if goals.target_boundary:
+            rows = topology.boundary_indices[free[topology.boundary_indices]]
+        else:
+            rows = topology.corner_indices[free[topology.corner_indices]]
+        corner_mask = topology.valences[rows] == 2
+        positions[rows] = goals.boundary_projector.project(positions[rows], corner_mask=corner_mask)
+
+
+class MultilevelRelaxer:
+    """
+    Coarse-to-fine relaxation of a grid mesh generated by `QuadMesher`.
+
+    Low-frequency errors travel only one ring of neighbors per step, so relaxing a dense
+    mesh from its raw surface sampling takes many iterations. This relaxer builds coarser
+    copies of the mesh by keeping every ``2**level``-th grid line (using the ``u`` and ``v``
+    vertex attributes written by the mesher), relaxes the coarsest level first and moves the
+    converged positions up to the next finer level as its starting state, ending at the
+    full resolution. The same goals, modifiers and relaxer options are used at every level,
+    except the damping: the spring forces grow with the edge length, so the damping of a
+    level with stride ``2**level`` is divided by the stride to keep its steps stable. The
+    coarse levels also keep the grid lines through the fixed vertices of the mesh, which are
+    fixed on every level, so that they shape the coarse solutions as well. The coarse levels
+    are cheap, so they can be given many more iterations (or a convergence tolerance) than
+    the full resolution.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The grid mesh to relax. Its vertices need the ``u`` and ``v`` grid index attributes.
+    levels : int, optional
+        The number of levels, including the full resolution.
+    iterations : int, optional
+        The number of iterations at the full resolution.
+    coarse_iterations : int, optional
+        The number of iterations at every coarse level. Defaults to ``iterations``.
+    **relaxer_options
+        Further options passed to the `MeshRelaxer` of every level,
+        e.g. ``damping`` (of the full resolution), ``modifiers``, ``goals``, ``engine`` or the tolerances.
+
+    Attributes
+    ----------
+    meshes : list[Mesh]
+        The meshes of all levels, from the full resolution to the coarsest.
+    relaxers : list[MeshRelaxer]
+        The relaxers of the last call to :meth:`relax`, in the same order.
+
+    """
+
+    def __init__(self, mesh: Mesh, levels: int = 3, iterations: int = 50, coarse_iterations: int = None, **relaxer_options):
+        if any(mesh.vertex_attribute(vertex, "u") is None or mesh.vertex_attribute(vertex, "v") is None for vertex in mesh.vertices()):
+            raise ValueError("MultilevelRelaxer needs the 'u' and 'v' grid index vertex attributes written by QuadMesher.")
+
+        self.mesh = mesh
+        self.levels = levels
+        self.iterations = iterations
+        self.coarse_iterations = iterations if coarse_iterations is None else coarse_iterations
+        self.relaxer_options = relaxer_options
+        self.relaxers = []
+        self._build_levels(self._fixed_vertices())
+
+    def _fixed_vertices(self) -> set:
+        return {vertex for vertex in self.mesh.vertices() if self.mesh.vertex_attribute(vertex, "fixed")}
+
+    def _build_levels(self, fixed: set) -> None:
+        self.meshes = [self.mesh]
+        self._levels_fixed = fixed
+        for level in range(1, self.levels):
+            coarse = self.coarsen(self.mesh, 2**level, keep=fixed)
+            if coarse.number_of_faces() == 0:
+                break
+            self.meshes.append(coarse)
+
+    @staticmethod
+    def grid_lines(count: int, stride: int) -> list[int]:
+        """Return the grid indices kept with the given stride, always including the last one."""
+        lines = list(range(0, count + 1, stride))
+        if lines[-1] != count:
+            lines.append(count)
+        return lines
+
+    @classmethod
+    def coarsen(cls, mesh: Mesh, stride: int, keep=()) -> Mesh:
+        """
+        Return a copy of the grid mesh with only every ``stride``-th grid line, keeping the vertex keys.
+
+        The grid lines through the vertices in ``keep`` are kept as well, e.g. so that the fixed vertices are part of every level.
+        """
+        grid = {(mesh.vertex_attribute(vertex, "u"), mesh.vertex_attribute(vertex, "v")): vertex for vertex in mesh.vertices()}
+        u_lines = cls.grid_lines(max(u for u, _ in grid), stride)
+        v_lines = cls.grid_lines(max(v for _, v in grid), stride)
+        if keep:
+            u_lines = sorted(set(u_lines) | {mesh.vertex_attribute(vertex, "u") for vertex in keep})
+            v_lines = sorted(set(v_lines) | {mesh.vertex_attribute(vertex, "v") for vertex in keep})
+
+        coarse = Mesh()
+        for u in u_lines:
+            for v in v_lines:
+                if (u, v) in grid:
+                    vertex = grid[u, v]
+                    attributes = {name: value for name, value in mesh.vertex_attributes(vertex).items() if name != "force"}
+                    coarse.add_vertex(key=vertex, attr_dict=attributes)
+
+        # Same cell layout and clipping rule as `QuadMesher.generate_mesh`.
+        for u0, u1 in zip(u_lines[:-1], u_lines[1:]):
+            for v0, v1 in zip(v_lines[:-1], v_lines[1:]):
+                corners = [(u0, v0), (u0, v1), (u1, v1), (u1, v0)]
+                face_vertices = [grid[corner] for corner in corners if corner in grid]
+                if len(face_vertices) >= 3:
+                    coarse.add_face(face_vertices)
+
+        coarse.remove_unused_vertices()
+        return coarse
+
     def relax(self) -> Mesh:
-        # 1. Start a loop that runs for the number of `self.iterations`
-        # 2. Inside the loop, compute forces (for example, interior forces, boundary forced, etc)
-        #    following the ideas that we explored the the examples of mesh relaxation.
-        # 3. If there are any modifiers (`self.modifiers`), call the `apply` of each of them.
-        # 4. Apply all accumulated forces to update the mesh vertices.
-        # 5. Increment the iteration counter `self.step` by 1.
-        # 6. After the loop finishes, return the relaxed `self.mesh`.
-        pass
+        """Relax all levels from the coarsest to the full resolution and return the relaxed mesh."""
+        self.relaxers = []
+        # Every MeshRelaxer resets the fixed attribute, so the fixed vertices of the mesh are set again on every level.
+        fixed = self._fixed_vertices()
+        if fixed != self._levels_fixed:
+            self._build_levels(fixed)
+
+        # The coarse levels start from the current state of the full resolution mesh.
+        for coarse in self.meshes[1:]:
+            for vertex in coarse.vertices():
+                coarse.vertex_attributes(vertex, "xyz", self.mesh.vertex_coordinates(vertex))
+
+        for level in range(len(self.meshes) - 1, -1, -1):
+            mesh = self.meshes[level]
+            iterations = self.iterations if level == 0 else self.coarse_iterations
+
+            relaxer = MeshRelaxer(mesh, iterations=iterations, **self.relaxer_options)
+            for vertex in mesh.vertices():
+                mesh.vertex_attribute(vertex, "fixed", vertex in fixed)
+            relaxer.damping /= 2**level
+            relaxer.effective_damping = relaxer.damping
+            relaxer.relax()
+            self.relaxers.insert(0, relaxer)
+
+            if level > 0:
+                self.prolongate(mesh, self.meshes[level - 1], fixed)
+
+        return self.mesh
+
+    @staticmethod
+    def prolongate(coarse: Mesh, fine: Mesh, fixed=()) -> None:
+        """
+        Move the relaxed positions of the coarse mesh up to the next finer mesh.
+
+        Vertices shared by both levels take the relaxed coarse position. Every other fine
+        vertex takes the bilinear interpolation of the positions of the corners of its coarse
+        grid cell, renormalized over the corners that exist. Fixed vertices and vertices without
+        any coarse corner keep their position.
+        """
+        positions = {}
+        for vertex in coarse.vertices():
+            u, v = coarse.vertex_attribute(vertex, "u"), coarse.vertex_attribute(vertex, "v")
+            positions[u, v] = np.array(coarse.vertex_coordinates(vertex))
+
+        u_lines = sorted({u for u, _ in positions})
+        v_lines = sorted({v for _, v in positions})
+
+        for vertex in fine.vertices():
+            if vertex in fixed:
+                continue
+            u, v = fine.vertex_attribute(vertex, "u"), fine.vertex_attribute(vertex, "v")
+            i = min(max(bisect_right(u_lines, u) - 1, 0), len(u_lines) - 2)
+            j = min(max(bisect_right(v_lines, v) - 1, 0), len(v_lines) - 2)
+            if i < 0 or j < 0:
+                continue
+            u0, u1, v0, v1 = u_lines[i], u_lines[i + 1], v_lines[j], v_lines[j + 1]
+            s, t = (u - u0) / (u1 - u0), (v - v0) / (v1 - v0)
+
+            position = np.zeros(3)
+            total = 0.0
+            for corner, weight in (
+                ((u0, v0), (1 - s) * (1 - t)),
+                ((u1, v0), s * (1 - t)),
+                ((u0, v1), (1 - s) * t),
+                ((u1, v1), s * t),
+            ):
+                if weight > 0 and corner in positions:
+                    position += weight * positions[corner]
+                    total += weight
+
+            if total > 0:
+                fine.vertex_attributes(vertex, "xyz", (position / total).tolist())
@@ -1,40 +1,113 @@
-import Rhino.Geometry as rg  # type: ignore
+import numpy as np
+from a02_nurbs import NurbsSurfaceEvaluator
+from a02_trim import TrimmedFace
 from compas.datastructures import Mesh
 from compas.geometry import NurbsSurface
 from compas.itertools import linspace
 
+try:
+    import Rhino.Geometry as rg  # type: ignore
+except ImportError:
+    rg = None
+
 
 class BaseMesher:
-    """Small shared base class for Brep-based meshers."""
+    """
+    Small shared base class for Brep-based meshers.
+
+    The Brep can also be a `TrimmedFace`, a surface with polygonal trim loops, to mesh
+    without Rhino.
+    """
 
-    def __init__(self, u_count: int, v_count: int, brep: rg.Brep):
+    # Maximum deviation of the trim loop polygons from the trim curves of a Brep face, in UV units.
+    # The same value is the boundary tolerance of the classification, so that grid nodes on a trim
+    # curve are on the boundary of its polygon as well.
+    trim_tolerance = 1e-6
+
+    def __init__(self, u_count: int, v_count: int, brep: "rg.Brep | TrimmedFace"):
         self.u_count = u_count
         self.v_count = v_count
         self.brep = brep
         self.mesh = Mesh()
+        # (u index, v index) -> vertex key of the grid nodes.
+        self.vertex_grid = {}
+        self._surface = None
+        self._surface_brep = None
+        self._trim = None
+        self._trim_brep = None
+        self._on_face = None
+        self._on_face_trim = None
 
     @property
-    def face(self) -> rg.BrepFace:
+    def face(self) -> "rg.BrepFace":
         return self.brep.Faces[0]
 
     @property
     def surface(self) -> NurbsSurface:
-        return NurbsSurface.from_native(self.face.UnderlyingSurface())
+        if isinstance(self.brep, TrimmedFace):
+            return self.brep.surface
+        # The conversion from Rhino is expensive, so it only happens once per Brep.
+        if self._surface is None or self._surface_brep is not self.brep:
+            self._surface = NurbsSurface.from_native(self.face.UnderlyingSurface())
+            self._surface_brep = self.brep
+        return self._surface
 
-    def is_vertex_on_face(self, vertex_key) -> bool:
-        point = self.mesh.vertex_point(vertex_key)
-        _, face_u, face_v = self.face.ClosestPoint(rg.Point3d(point.x, point.y, point.z))
-        relation = self.face.IsPointOnFace(face_u, face_v)
+    @property
+    def trim(self) -> TrimmedFace:
+        """The face with its trim loops as UV polygons."""
+        if isinstance(self.brep, TrimmedFace):
+            return self.brep
+        if self._trim is None or self._trim_brep is not self.brep:
+            self._trim = TrimmedFace(self.surface, self._trim_loops(self.face, self.trim_tolerance), tolerance=self.trim_tolerance)
+            self._trim_brep = self.brep
+        return self._trim
+
+    @staticmethod
+    def _trim_loops(face: "rg.BrepFace", tolerance: float) -> list:
+        # The outer loop first, then the holes, each as a polygon in the UV space of the surface.
+        loops = sorted(face.Loops, key=lambda loop: loop.LoopType != rg.BrepLoopType.Outer)
+        polygons = []
+        for loop in loops:
+            polyline = loop.To2dCurve().ToPolyline(tolerance, 0.0, 0.0, 0.0)
+            polygons.append([(polyline.Point(i).X, polyline.Point(i).Y) for i in range(polyline.PointCount)])
+        return polygons
+
+    def grid_parameters(self) -> tuple:
+        """Return the U and V parameters of the grid lines."""
+        surface = self.surface
+        u_values = list(linspace(surface.domain_u[0], surface.domain_u[1], self.u_count + 1))
+        v_values = list(linspace(surface.domain_v[0], surface.domain_v[1], self.v_count + 1))
+        return u_values, v_values
+
+    def grid_on_face(self):
+        """
+        Classify all grid nodes at once against the trim loops of the face.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array of shape ``(u_count + 1, v_count + 1)``, True for the nodes inside or on
+            the boundary of the face. It is computed once and then cached.
+
+        """
+        trim = self.trim
+        if self._on_face is None or self._on_face_trim is not trim:
+            u_values, v_values = np.meshgrid(*self.grid_parameters(), indexing="ij")
+            self._on_face = trim.contains(u_values, v_values)
+            self._on_face_trim = trim
+        return self._on_face
 
-        if relation == rg.PointFaceRelation.Interior:
-            return True
-        if relation == rg.PointFaceRelation.Boundary:
-            return True
+    def is_vertex_on_face(self, vertex_key) -> bool:
+        u_index, v_index = self.mesh.vertex_attributes(vertex_key, ["u", "v"])
+        return bool(self.grid_on_face()[u_index, v_index])
 
-        return False
+    def _add_grid_vertex(self, x: float, y: float, z: float, u_index: int, v_index: int) -> int:
+        vertex_key = self.mesh.add_vertex(x=x, y=y, z=z, u=u_index, v=v_index)
+        self.vertex_grid[u_index, v_index] = vertex_key
+        return vertex_key
 
     def _vertex_key(self, u_index: int, v_index: int) -> int:
-        return next(self.mesh.vertices_where({"u": u_index, "v": v_index}))
+        return self.vertex_grid[u_index, v_index]
 
     def _filtered_face_vertices(self, vertex_keys: list[int]) -> list[int]:
         filtered_vertices = []
@@ -47,19 +120,20 @@ class BaseMesher:
 
 
 class QuadMesher(BaseMesher):
-    def __init__(self, u_count: int, v_count: int, brep: rg.Brep, full_quads: bool = False):
+    def __init__(self, u_count: int, v_count: int, brep: "rg.Brep | TrimmedFace", full_quads: bool = False):
         super().__init__(u_count=u_count, v_count=v_count, brep=brep)
         self.full_quads = full_quads
 
     def generate_vertices(self) -> None:
         """Sample the surface on a regular UV grid and store mesh vertices."""
-        u_values = list(linspace(self.surface.domain_u[0], self.surface.domain_u[1], self.u_count + 1))
-        v_values = list(linspace(self.surface.domain_v[0], self.surface.domain_v[1], self.v_count + 1))
+        u_values, v_values = self.grid_parameters()
+
+        # The whole grid in one evaluation: basis functions once per row and column.
+        points = NurbsSurfaceEvaluator.from_surface(self.surface).grid(u_values, v_values).tolist()
 
-        for ui, u in enumerate(u_values):
-            for vi, v in enumerate(v_values):
-                point = self.surface.point_at(u, v)
-                self.mesh.add_vertex(x=point.x, y=point.y, z=point.z, u=ui, v=vi)
+        for ui, row in enumerate(points):
+            for vi, (x, y, z) in enumerate(row):
+                self._add_grid_vertex(x, y, z, ui, vi)
         return None
 
     def generate_mesh(self) -> Mesh:
@@ -81,4 +155,5 @@ class QuadMesher(BaseMesher):
                 self.mesh.add_face(face_vertices)
 
         self.mesh.remove_unused_vertices()
+        self.vertex_grid = {grid: vertex for grid, vertex in self.vertex_grid.items() if self.mesh.has_vertex(vertex)}
         return self.mesh
@@ -1,3 +1,273 @@
+import numpy as np
+from compas.geometry import Point
+from compas.geometry import Vector
+
+# ========================================================================
+# MODIFIER INTERFACE
+# Every modifier implements `apply(self, relaxer, mesh)`, which works on
+# the mesh vertex by vertex and adds to the `force` attribute.
+# A modifier can additionally implement the batched interface
+# `apply_batch(self, relaxer, positions, forces, mask)`, which works on
+# the packed arrays of the numpy engine:
+# - `positions`: (n, 3) array of vertex coordinates (read only)
+# - `forces`: (n, 3) array of vertex forces, updated in place
+# - `mask`: (n,) boolean array, True for vertices with more than two neighbors
+# The `MeshRelaxer` prefers `apply_batch` when a modifier provides it.
+# Modifiers that need face or vertex normals read them from the shared
+# cache `relaxer.normals.update(positions)` instead of computing their own.
+# ========================================================================
+
+
+def apply_batch_to_mesh(modifier, relaxer, mesh):
+    """Run the batched interface of a modifier on the vertices of the mesh and add the result to their forces."""
+    topology = relaxer.topology
+    positions = np.array([mesh.vertex_coordinates(vertex) for vertex in topology.vertices], dtype=float).reshape(-1, 3)
+    forces = np.zeros_like(positions)
+    modifier.apply_batch(relaxer, positions, forces, topology.modifier_mask)
+
+    for vertex, force in zip(topology.vertices, forces.tolist()):
+        if force != [0.0, 0.0, 0.0]:
+            mesh.vertex_attribute(vertex, "force", mesh.vertex_attribute(vertex, "force") + Vector(*force))
+
+
+class AttractorPointsModifier:
+    """Pull the vertices towards (or push them away from) a set of attractor points.
+
+    Parameters
+    ----------
+    points : list[Point]
+        The attractor points.
+    force : float
+        Magnitude of the force of every attractor. Negative values repel.
+
+    """
+
+    def __init__(self, points: list[Point], force: float):
+        self.points = list(points)
+        self.attraction_force = force
+        self.type = "force_modifier"
+
+    def apply(self, relaxer, mesh):
+        for attractor_point in self.points:
+            for vertex in mesh.vertices():
+                neighbors = mesh.vertex_neighbors(vertex)
+
+                if len(neighbors) <= 2:
+                    continue
+
+                vertex_point = mesh.vertex_point(vertex)
+                direction = Vector.from_start_end(vertex_point, attractor_point)
+                attraction_force = direction * (1 / direction.length) * self.attraction_force
+                force = mesh.vertex_attribute(vertex, "force")
+                force += attraction_force
+                mesh.vertex_attribute(vertex, "force", force)
+
+    def apply_batch(self, relaxer, positions, forces, mask):
+        attractors = np.array([list(point) for point in self.points], dtype=float).reshape(-1, 3)
+
+        # (vertices, attractors, 3) directions from every vertex to every attractor.
+        directions = attractors[None, :, :] - positions[mask][:, None, :]
+        lengths = np.linalg.norm(directions, axis=2, keepdims=True)
+        unit_directions = np.divide(directions, lengths, out=np.zeros_like(directions), where=lengths > 0)
+
+        forces[mask] += unit_directions.sum(axis=1) * self.attraction_force
+
+
+class AttractorPointModifier(AttractorPointsModifier):
+    """Pull the vertices towards (or push them away from) a single attractor point."""
+
+    def __init__(self, point: Point, force: float):
+        super().__init__(points=[point], force=force)
+        self.point = point
+
+
+class DirectionalForceModifier:
+    """Push the vertices along a constant direction, e.g. gravity or wind.
+
+    Parameters
+    ----------
+    direction : Vector
+        The direction of the force.
+    force : float
+        Magnitude of the force.
+
+    """
+
+    def __init__(self, direction: Vector, force: float):
+        self.direction = direction
+        self.force = force
+        self.type = "force_modifier"
+
+    def apply(self, relaxer, mesh):
+        for vertex in mesh.vertices():
+            neighbors = mesh.vertex_neighbors(vertex)
+
+            if len(neighbors) <= 2:
+                continue
+
+            force = mesh.vertex_attribute(vertex, "force")
+            directional_force = self.direction * self.force
+            force += directional_force
+            mesh.vertex_attribute(vertex, "force", force)
+
+    def apply_batch(self, relaxer, positions, forces, mask):
+        forces[mask] += np.array(list(self.direction), dtype=float) * self.force
+
+
+class RepulsionModifier:
+    """Push apart vertices that come closer than a radius without sharing an edge.
+
+    Close vertex pairs are found with a uniform spatial hash grid with cells of the size of
+    the radius, so only vertices in the same or in neighboring cells are compared and the
+    cost grows about linearly with the number of vertices. The vertices are kept sorted by
+    their cell between steps; since only few vertices change their cell in one step, the
+    re-sort of the next step runs on almost sorted keys and is close to linear as well.
+    Under a `BatchRelaxer`, only vertices of the same mesh repel each other.
+
+    Parameters
+    ----------
+    radius : float
+        The distance below which two vertices repel each other.
+    force : float
+        Magnitude of the repulsion of two coincident vertices. It fades linearly to zero at ``radius``.
+
+    """
+
+    # Offsets of the neighboring cells, half of them: every pair of cells is visited once.
+    NEIGHBOR_CELLS = np.array([(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1) if (i, j, k) > (0, 0, 0)])
+
+    def __init__(self, radius: float, force: float):
+        self.radius = radius
+        self.force = force
+        self.type = "force_modifier"
+        self._order = None
+        self._topology = None
+        self._edge_codes = None
+        self._meshes = None
+
+    def apply(self, relaxer, mesh):
+        apply_batch_to_mesh(self, relaxer, mesh)
+
+    def apply_batch(self, relaxer, positions, forces, mask):
+        first, second = self.close_pairs(positions, relaxer.topology)
+        if not len(first):
+            return
+
+        vectors = positions[first] - positions[second]
+        distances = np.linalg.norm(vectors, axis=1)
+        magnitudes = self.force * (1.0 - distances / self.radius)
+        # Coincident vertices have no direction to separate along.
+        pushes = np.divide(vectors * magnitudes[:, None], distances[:, None], out=np.zeros_like(vectors), where=distances[:, None] > 0)
+
+        repulsion = np.zeros_like(positions)
+        for axis in range(3):
+            repulsion[:, axis] = np.bincount(first, weights=pushes[:, axis], minlength=len(positions))
+            repulsion[:, axis] -= np.bincount(second, weights=pushes[:, axis], minlength=len(positions))
+        forces[mask] += repulsion[mask]
+
+    def close_pairs(self, positions, topology) -> tuple:
+        """Return the rows ``(first, second)`` of all vertex pairs of the same mesh closer than the radius that do not share an edge."""
+        n = len(positions)
+        cells = np.floor(positions / self.radius).astype(np.int64)
+        cells -= cells.min(axis=0) - 1
+        size = cells.max(axis=0) + 2
+
+        def encode(cells):
+            return (cells[:, 0] * size[1] + cells[:, 1]) * size[2] + cells[:, 2]
+
+        keys = encode(cells)
+        order = self._order if self._order is not None and len(self._order) == n else np.arange(n)
+        # Timsort on the order of the last step: almost sorted, so almost linear.
+        order = order[np.argsort(keys[order], kind="stable")]
+        self._order = order
+
+        sorted_keys = keys[order]
+        cell_keys, cell_starts, cell_counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+
+        first, second = [], []
+        # Pairs within the same cell.
+        rows = np.arange(n)
+        cell = np.searchsorted(cell_keys, keys)
+        pairs = self._expand(rows, cell_starts[cell], cell_counts[cell], order)
+        same_cell = pairs[0] < pairs[1]
+        first.append(pairs[0][same_cell])
+        second.append(pairs[1][same_cell])
+
+        # Pairs with the neighboring cells.
+        for offset in self.NEIGHBOR_CELLS:
+            neighbor_keys = encode(cells + offset)
+            cell = np.minimum(np.searchsorted(cell_keys, neighbor_keys), len(cell_keys) - 1)
+            occupied = cell_keys[cell] == neighbor_keys
+            pairs = self._expand(rows[occupied], cell_starts[cell[occupied]], cell_counts[cell[occupied]], order)
+            first.append(pairs[0])
+            second.append(pairs[1])
+
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+        vectors = positions[first] - positions[second]
+        close = np.einsum("ij,ij->i", vectors, vectors) < self.radius**2
+        first, second = first[close], second[close]
+
+        if topology.mesh_count > 1:
+            meshes = self._get_topology_arrays(topology)[1]
+            same_mesh = meshes[first] == meshes[second]
+            first, second = first[same_mesh], second[same_mesh]
+
+        codes = np.minimum(first, second) * n + np.maximum(first, second)
+        edge_codes = self._get_topology_arrays(topology)[0]
+        position = np.minimum(np.searchsorted(edge_codes, codes), max(len(edge_codes) - 1, 0))
+        connected = edge_codes[position] == codes if len(edge_codes) else np.zeros(len(codes), dtype=bool)
+        return first[~connected], second[~connected]
+
+    @staticmethod
+    def _expand(rows, starts, counts, order) -> tuple:
+        # Every row paired with every vertex of its cell: a ragged range per row.
+        total = counts.sum()
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(rows, counts), order[np.repeat(starts, counts) + offsets]
+
+    def _get_topology_arrays(self, topology) -> tuple:
+        # The sorted edge codes and the mesh of every row of the (stacked) topology.
+        if topology is not self._topology:
+            n = topology.vertex_count
+            codes = np.minimum(topology.rows, topology.indices) * n + np.maximum(topology.rows, topology.indices)
+            self._edge_codes = np.unique(codes)
+            self._meshes = np.repeat(np.arange(topology.mesh_count), np.diff(topology.offsets))
+            self._topology = topology
+        return self._edge_codes, self._meshes
+
+
+class PressureModifier:
+    """Push the vertices along their normals, like a pressure inflating the mesh.
+
+    The normals come from the shared normals cache of the relaxer, which computes all face
+    and vertex normals of a step in one vectorized pass.
+
+    Parameters
+    ----------
+    pressure : float
+        The pressure. Negative values deflate.
+    area_weighted : bool, optional
+        If True, every vertex is pushed by the pressure times its share of the areas of its
+        faces, so larger faces push harder, like a real pressure. If False, every vertex is
+        pushed by the pressure along its unit normal.
+
+    """
+
+    def __init__(self, pressure: float, area_weighted: bool = True):
+        self.pressure = pressure
+        self.area_weighted = area_weighted
+        self.type = "force_modifier"
+
+    def apply(self, relaxer, mesh):
+        apply_batch_to_mesh(self, relaxer, mesh)
+
+    def apply_batch(self, relaxer, positions, forces, mask):
+        normals = relaxer.normals.update(positions)
+        pushes = normals.vertex_area_vectors if self.area_weighted else normals.vertex_normals
+        forces[mask] += pushes[mask] * self.pressure
+
+
 # ========================================================================
 # CHALLENGE 02: Custom Modifiers
 # To complete this challenge:
@@ -19,4 +289,3 @@
 #         # return the modified mesh
 #         return mesh
 # ========================================================================
-
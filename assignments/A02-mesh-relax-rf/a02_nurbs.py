@@ -0,0 +1,260 @@
+import numpy as np
+from compas.geometry import NurbsSurface
+
+
+def find_spans(knots: np.ndarray, degree: int, count: int, params: np.ndarray) -> np.ndarray:
+    """Return the knot span index of every parameter value.
+
+    Parameters
+    ----------
+    knots : numpy.ndarray
+        The full (clamped) knot vector, of length ``count + degree + 1``.
+    degree : int
+        The degree of the basis functions.
+    count : int
+        The number of control points.
+    params : numpy.ndarray
+        The parameter values.
+
+    """
+    spans = np.searchsorted(knots, params, side="right") - 1
+    return np.clip(spans, degree, count - 1)
+
+
+def basis_functions(knots: np.ndarray, degree: int, spans: np.ndarray, params: np.ndarray, derivatives: int = 0) -> np.ndarray:
+    """Evaluate the non-zero B-spline basis functions and their derivatives for many parameters at once.
+
+    This is the algorithm A2.3 of *The NURBS Book* (Piegl & Tiller), with every scalar
+    replaced by an array over the parameter values.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape ``(m, derivatives + 1, degree + 1)``, where entry ``[i, k, j]`` is the
+        ``k``-th derivative of the basis function ``spans[i] - degree + j`` at ``params[i]``.
+        Derivatives of a higher order than ``degree`` are zero.
+
+    """
+    params = np.asarray(params, dtype=float)
+    m = len(params)
+    p = degree
+
+    ndu = np.zeros((m, p + 1, p + 1))
+    left = np.zeros((m, p + 1))
+    right = np.zeros((m, p + 1))
+    ndu[:, 0, 0] = 1.0
+
+    for j in range(1, p + 1):
+        left[:, j] = params - knots[spans + 1 - j]
+        right[:, j] = knots[spans + j] - params
+        saved = np.zeros(m)
+        for r in range(j):
+            ndu[:, j, r] = right[:, r + 1] + left[:, j - r]
+            temp = ndu[:, r, j - 1] / ndu[:, j, r]
+            ndu[:, r, j] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        ndu[:, j, j] = saved
+
+    ders = np.zeros((m, derivatives + 1, p + 1))
+    ders[:, 0, :] = ndu[:, :, p]
+    derivatives_computed = min(derivatives, p)
+
+    for r in range(p + 1):
+        a = np.zeros((2, m, p + 1))
+        a[0, :, 0] = 1.0
+        s1, s2 = 0, 1
+        for k in range(1, derivatives_computed + 1):
+            d = np.zeros(m)
+            rk = r - k
+            pk = p - k
+            if r >= k:
+                a[s2, :, 0] = a[s1, :, 0] / ndu[:, pk + 1, rk]
+                d = a[s2, :, 0] * ndu[:, rk, pk]
+            j1 = 1 if rk >= -1 else -rk
+            j2 = k - 1 if r - 1 <= pk else p - r
+            for j in range(j1, j2 + 1):
+                a[s2, :, j] = (a[s1, :, j] - a[s1, :, j - 1]) / ndu[:, pk + 1, rk + j]
+                d = d + a[s2, :, j] * ndu[:, rk + j, pk]
+            if r <= pk:
+                a[s2, :, k] = -a[s1, :, k - 1] / ndu[:, pk + 1, r]
+                d = d + a[s2, :, k] * ndu[:, r, pk]
+            ders[:, k, r] = d
+            s1, s2 = s2, s1
+
+    factor = p
+    for k in range(1, derivatives_computed + 1):
+        ders[:, k, :] *= factor
+        factor *= p - k
+
+    return ders
+
+
+class NurbsSurfaceEvaluator:
+    """
+    Vectorized evaluation of a NURBS surface.
+
+    Evaluates points and first and second derivatives of a NURBS surface for many (u, v)
+    parameters in one call, directly from the control points, weights and knot vectors,
+    instead of one plugin call per parameter.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        The control points, shape ``(count_u, count_v, 3)``.
+    weights : numpy.ndarray
+        The control point weights, shape ``(count_u, count_v)``.
+    knots_u : list[float]
+        The knot vector in U direction. Rhino-style knot vectors without
+        the two superfluous end knots are accepted as well.
+    knots_v : list[float]
+        The knot vector in V direction.
+    degree_u : int
+        The degree in U direction.
+    degree_v : int
+        The degree in V direction.
+
+    """
+
+    def __init__(self, points, weights, knots_u, knots_v, degree_u: int, degree_v: int):
+        points = np.asarray(points, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        self.count_u, self.count_v = weights.shape
+        self.degree_u = degree_u
+        self.degree_v = degree_v
+        self.knots_u = self._full_knots(knots_u, self.count_u, degree_u)
+        self.knots_v = self._full_knots(knots_v, self.count_v, degree_v)
+        # Homogeneous control points (w * x, w * y, w * z, w).
+        self.homogeneous = np.concatenate((points * weights[:, :, None], weights[:, :, None]), axis=2)
+
+    @classmethod
+    def from_surface(cls, surface: NurbsSurface) -> "NurbsSurfaceEvaluator":
+        """Create an evaluator from a COMPAS `NurbsSurface`."""
+        points = [[list(point) for point in row] for row in surface.points]
+        return cls(
+            points=points,
+            weights=surface.weights,
+            knots_u=surface.knotvector_u,
+            knots_v=surface.knotvector_v,
+            degree_u=surface.degree_u,
+            degree_v=surface.degree_v,
+        )
+
+    @staticmethod
+    def _full_knots(knots, count: int, degree: int) -> np.ndarray:
+        knots = np.asarray(knots, dtype=float)
+        if len(knots) == count + degree - 1:
+            knots = np.concatenate(([knots[0]], knots, [knots[-1]]))
+        if len(knots) != count + degree + 1:
+            raise ValueError(f"Expected {count + degree + 1} knots for {count} control points of degree {degree}, got {len(knots)}.")
+        return knots
+
+    @property
+    def domain_u(self) -> tuple:
+        return self.knots_u[self.degree_u], self.knots_u[self.count_u]
+
+    @property
+    def domain_v(self) -> tuple:
+        return self.knots_v[self.degree_v], self.knots_v[self.count_v]
+
+    def clamp(self, u: np.ndarray, v: np.ndarray) -> tuple:
+        """Clamp parameters to the surface domain."""
+        return np.clip(u, *self.domain_u), np.clip(v, *self.domain_v)
+
+    def evaluate(self, u, v, derivatives: int = 0) -> tuple:
+        """
+        Evaluate the surface at the parameters ``(u[i], v[i])``.
+
+        Parameters
+        ----------
+        u : numpy.ndarray
+            The U parameters.
+        v : numpy.ndarray
+            The V parameters.
+        derivatives : int, optional
+            ``0`` for points only, ``1`` to add the first and
+            ``2`` to add the second partial derivatives.
+
+        Returns
+        -------
+        tuple
+            ``(S,)``, ``(S, Su, Sv)`` or ``(S, Su, Sv, Suu, Suv, Svv)``,
+            each an array of shape ``(m, 3)``.
+
+        """
+        u, v = self.clamp(np.atleast_1d(np.asarray(u, dtype=float)), np.atleast_1d(np.asarray(v, dtype=float)))
+        spans_u = find_spans(self.knots_u, self.degree_u, self.count_u, u)
+        spans_v = find_spans(self.knots_v, self.degree_v, self.count_v, v)
+        basis_u = basis_functions(self.knots_u, self.degree_u, spans_u, u, derivatives)
+        basis_v = basis_functions(self.knots_v, self.degree_v, spans_v, v, derivatives)
+
+        rows = spans_u[:, None] - self.degree_u + np.arange(self.degree_u + 1)
+        cols = spans_v[:, None] - self.degree_v + np.arange(self.degree_v + 1)
+        local = self.homogeneous[rows[:, :, None], cols[:, None, :]]
+
+        # Homogeneous derivatives A[:, k, l] = d^(k+l) / du^k dv^l of (w * x, w * y, w * z, w),
+        # contracting the V basis first and then the U basis as batched matrix products.
+        m = len(u)
+        partial = np.matmul(basis_v[:, None, :, :], local).reshape(m, self.degree_u + 1, -1)
+        derivatives_table = np.matmul(basis_u, partial).reshape(m, derivatives + 1, derivatives + 1, 4)
+
+        def homogeneous_derivative(k, l):
+            return derivatives_table[:, k, l]
+
+        A = homogeneous_derivative(0, 0)
+        w = A[:, 3:]
+        S = A[:, :3] / w
+        if derivatives == 0:
+            return (S,)
+
+        # Derivatives of the rational surface from the homogeneous ones (The NURBS Book, eq. 4.20).
+        Au = homogeneous_derivative(1, 0)
+        Av = homogeneous_derivative(0, 1)
+        Su = (Au[:, :3] - Au[:, 3:] * S) / w
+        Sv = (Av[:, :3] - Av[:, 3:] * S) / w
+        if derivatives == 1:
+            return S, Su, Sv
+
+        Auu = homogeneous_derivative(2, 0)
+        Avv = homogeneous_derivative(0, 2)
+        Auv = homogeneous_derivative(1, 1)
+        Suu = (Auu[:, :3] - 2 * Au[:, 3:] * Su - Auu[:, 3:] * S) / w
+        Suv = (Auv[:, :3] - Au[:, 3:] * Sv - Av[:, 3:] * Su - Auv[:, 3:] * S) / w
+        Svv = (Avv[:, :3] - 2 * Av[:, 3:] * Sv - Avv[:, 3:] * S) / w
+        return S, Su, Sv, Suu, Suv, Svv
+
+    def grid(self, u_values, v_values) -> np.ndarray:
+        """
+        Evaluate the surface on the tensor grid of the given U and V parameters.
+
+        The basis functions are evaluated once per U value and once per V value instead of
+        once per grid node, and the grid is contracted with the control points as two matrix
+        products.
+
+        Returns
+        -------
+        numpy.ndarray
+            The points ``S(u_values[i], v_values[j])``, shape ``(len(u_values), len(v_values), 3)``.
+
+        """
+        u_values, v_values = self.clamp(np.asarray(u_values, dtype=float), np.asarray(v_values, dtype=float))
+        basis_u = self._basis_matrix(self.knots_u, self.degree_u, self.count_u, u_values)
+        basis_v = self._basis_matrix(self.knots_v, self.degree_v, self.count_v, v_values)
+
+        # (U, count_u) x (count_u, count_v, 4) -> (U, count_v, 4), then with (V, count_v) -> (U, V, 4).
+        partial = np.tensordot(basis_u, self.homogeneous, axes=(1, 0))
+        homogeneous = np.einsum("ibk,jb->ijk", partial, basis_v)
+        return homogeneous[:, :, :3] / homogeneous[:, :, 3:]
+
+    @staticmethod
+    def _basis_matrix(knots: np.ndarray, degree: int, count: int, params: np.ndarray) -> np.ndarray:
+        """Return the dense matrix of all basis functions at the parameters, shape ``(m, count)``."""
+        spans = find_spans(knots, degree, count, params)
+        values = basis_functions(knots, degree, spans, params)[:, 0, :]
+        matrix = np.zeros((len(params), count))
+        columns = spans[:, None] - degree + np.arange(degree + 1)
+        matrix[np.arange(len(params))[:, None], columns] = values
+        return matrix
+
+    def points_at(self, u, v) -> np.ndarray:
+        """Return the surface points at the parameters ``(u[i], v[i])``, shape ``(m, 3)``."""
+        return self.evaluate(u, v)[0]
@@ -0,0 +1,133 @@
+import time
+
+
+class StepProfile:
+    """
+    Wall times and call counts of one relaxation step.
+
+    Attributes
+    ----------
+    step : int
+        The step number.
+    phases : dict[str, float]
+        Seconds spent in every phase of the step.
+    phase_calls : dict[str, int]
+        Number of calls of every phase during the step.
+    modifiers : dict[str, float]
+        Seconds spent in every modifier class during the step.
+    modifier_calls : dict[str, int]
+        Number of calls of every modifier class during the step.
+
+    """
+
+    def __init__(self, step: int):
+        self.step = step
+        self.phases = {}
+        self.phase_calls = {}
+        self.modifiers = {}
+        self.modifier_calls = {}
+
+    @property
+    def total(self) -> float:
+        """The time spent in all phases, in seconds."""
+        return sum(self.phases.values())
+
+    def __repr__(self):
+        phases = ", ".join(f"{name}={seconds * 1000:.3f}ms" for name, seconds in self.phases.items())
+        return f"StepProfile(step={self.step}, {phases})"
+
+
+class RelaxProfiler:
+    """
+    Per-phase and per-modifier timing of the steps of a `MeshRelaxer`.
+
+    A relaxation step has four phases: ``"forces"`` (spring forces), ``"modifiers"``
+    (all modifiers together), ``"apply_forces"`` (moving the vertices, the sparse solve
+    of the implicit engine) and ``"goals"`` (snapping to the targets). The relaxer only
+    times its phases when a profiler is attached, so without one nothing is measured.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Called after every step with the relaxer and the `StepProfile` of the step,
+        e.g. to print progress or to update a Grasshopper panel.
+    keep_records : bool, optional
+        Whether to keep the `StepProfile` of every step in ``records``.
+        The totals in :meth:`summary` are kept either way.
+
+    Attributes
+    ----------
+    records : list[StepProfile]
+        The profiles of the recorded steps.
+
+    """
+
+    PHASES = ("forces", "modifiers", "apply_forces", "goals")
+
+    def __init__(self, callback=None, keep_records: bool = True):
+        self.callback = callback
+        self.keep_records = keep_records
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all records and totals."""
+        self.records = []
+        self.current = None
+        self._seconds = {}
+        self._calls = {}
+
+    def begin_step(self, step: int) -> None:
+        self.current = StepProfile(step)
+
+    def end_step(self, relaxer) -> None:
+        record = self.current
+        self.current = None
+        if self.keep_records:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(relaxer, record)
+
+    def time_phase(self, name: str, function, *args):
+        """Call ``function(*args)`` and add its wall time to the phase ``name``."""
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+
+        self._add(name, seconds)
+        if self.current is not None:
+            self.current.phases[name] = self.current.phases.get(name, 0.0) + seconds
+            self.current.phase_calls[name] = self.current.phase_calls.get(name, 0) + 1
+        return result
+
+    def time_modifier(self, modifier, function, *args):
+        """Call ``function(*args)`` and add its wall time to the class of the modifier."""
+        name = type(modifier).__name__
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+
+        self._add(f"modifier:{name}", seconds)
+        if self.current is not None:
+            self.current.modifiers[name] = self.current.modifiers.get(name, 0.0) + seconds
+            self.current.modifier_calls[name] = self.current.modifier_calls.get(name, 0) + 1
+        return result
+
+    def summary(self) -> dict:
+        """
+        Return the totals of all profiled steps.
+
+        Returns
+        -------
+        dict[str, dict]
+            Map from phase name (or ``"modifier:<class name>"``) to a dict with the
+            number of ``calls``, the total ``seconds`` and the ``mean`` seconds per call.
+
+        """
+        return {
+            name: {"calls": self._calls[name], "seconds": seconds, "mean": seconds / self._calls[name]}
+            for name, seconds in sorted(self._seconds.items(), key=lambda item: -item[1])
+        }
+
+    def _add(self, name: str, seconds: float) -> None:
+        self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+        self._calls[name] = self._calls.get(name, 0) + 1
@@ -0,0 +1,498 @@
+import numpy as np
+from a02_nurbs import NurbsSurfaceEvaluator
+from compas.geometry import NurbsSurface
+from scipy.spatial import cKDTree
+
+
+class SurfaceProjector:
+    """
+    Batched closest-point projection onto a NURBS surface.
+
+    The surface is pre-sampled once on a regular UV grid and the samples are stored in a
+    KD-tree, which gives a starting parameter for every point. The projector also remembers
+    the last UV parameter of every projected vertex, so the next projection of the same
+    vertices only runs a few local Newton steps from there. Steps that move a point away
+    from the surface are halved, so no projection ends further away than where it started.
+    Points whose warm-started result is further away than their nearest sample restart from
+    the sample.
+
+    Parameters
+    ----------
+    surface : NurbsSurface
+        The surface to project onto.
+    samples : int, optional
+        The number of samples in each parameter direction.
+    newton_steps : int, optional
+        The maximum number of Newton steps per projection.
+    tolerance : float, optional
+        Newton iterations stop once no parameter changes by more than this value.
+
+    Attributes
+    ----------
+    evaluator : NurbsSurfaceEvaluator
+        Vectorized evaluator of the surface.
+    tree : scipy.spatial.cKDTree
+        KD-tree of the surface samples.
+    sample_parameters : numpy.ndarray
+        The UV parameters of the samples, shape ``(samples * samples, 2)``.
+
+    """
+
+    def __init__(self, surface: NurbsSurface, samples: int = 32, newton_steps: int = 5, tolerance: float = 1e-9):
+        self.surface = surface
+        self.newton_steps = newton_steps
+        self.tolerance = tolerance
+        self.evaluator = NurbsSurfaceEvaluator.from_surface(surface)
+
+        u_values = np.linspace(*self.evaluator.domain_u, samples)
+        v_values = np.linspace(*self.evaluator.domain_v, samples)
+        uu, vv = np.meshgrid(u_values, v_values, indexing="ij")
+        self.sample_parameters = np.column_stack((uu.ravel(), vv.ravel()))
+        self.tree = cKDTree(self.evaluator.points_at(self.sample_parameters[:, 0], self.sample_parameters[:, 1]))
+
+        self._keys = np.zeros(0, dtype=int)
+        self._parameters = np.zeros((0, 2))
+
+    def initial_parameters(self, points: np.ndarray) -> tuple:
+        """Return the parameters of the nearest surface sample and the distance to it for every point."""
+        distances, nearest = self.tree.query(points)
+        return self.sample_parameters[nearest], distances
+
+    def project(self, points: np.ndarray, keys: np.ndarray = None) -> np.ndarray:
+        """
+        Return the closest surface points of the given points.
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            The points to project, shape ``(m, 3)``.
+        keys : numpy.ndarray, optional
+            Integer identifiers of the points (e.g. vertex keys). Points with a key that was
+            projected before start from their last parameters.
+
+        Returns
+        -------
+        numpy.ndarray
+            The projected points, shape ``(m, 3)``.
+
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        sample_parameters, sample_distances = self.initial_parameters(points)
+
+        parameters = sample_parameters.copy()
+        if keys is not None:
+            keys = np.asarray(keys, dtype=int)
+            known, previous = self._lookup(keys)
+            parameters[known] = previous
+
+        parameters, projected = self._newton(points, parameters)
+
+        # A warm start can settle in a local minimum after large moves: restart those from the samples.
+        distances = np.linalg.norm(projected - points, axis=1)
+        restart = distances > sample_distances + self.tolerance
+        if keys is not None and restart.any():
+            parameters[restart], projected[restart] = self._newton(points[restart], sample_parameters[restart])
+
+        if keys is not None:
+            self._store(keys, parameters)
+        return projected
+
+    def remembered(self) -> tuple:
+        """Return copies of the keys and the UV parameters remembered for them."""
+        return self._keys.copy(), self._parameters.copy()
+
+    def remember(self, keys: np.ndarray, parameters: np.ndarray) -> None:
+        """Remember the UV parameters of the given keys, e.g. from an earlier relaxation."""
+        self._store(np.asarray(keys, dtype=int), np.asarray(parameters, dtype=float).reshape(-1, 2))
+
+    def forget(self) -> None:
+        """Drop the remembered parameters, e.g. after the surface changed."""
+        self._keys = np.zeros(0, dtype=int)
+        self._parameters = np.zeros((0, 2))
+
+    def _newton(self, points: np.ndarray, parameters: np.ndarray) -> tuple:
+        """
+        Minimize the squared distance to the surface with Newton steps on (u, v).
+
+        Every step is checked with the evaluation of the next one, so the check costs no extra
+        evaluation: a step that moved a point away from the surface is halved and tried again,
+        and a point whose last step did so goes back to the best parameters it had.
+        """
+        u, v = self.evaluator.clamp(parameters[:, 0].copy(), parameters[:, 1].copy())
+        (u_min, u_max), (v_min, v_max) = self.evaluator.domain_u, self.evaluator.domain_v
+        # The parameters with the smallest distance so far, and that squared distance.
+        best_u, best_v = u.copy(), v.copy()
+        best = np.full(len(points), np.inf)
+        # Only points that have not converged yet are evaluated again.
+        active = np.arange(len(points))
+
+        for _ in range(self.newton_steps):
+            if not len(active):
+                break
+
+            S, Su, Sv, Suu, Suv, Svv = self.evaluator.evaluate(u[active], v[active], derivatives=2)
+            d = S - points[active]
+            distances = np.einsum("ij,ij->i", d, d)
+
+            # Halve the last step of the points it moved away from the surface, e.g. far from a strongly curved surface.
+            worse = distances > best[active]
+            rows = active[worse]
+            u[rows] = 0.5 * (best_u[rows] + u[rows])
+            v[rows] = 0.5 * (best_v[rows] + v[rows])
+            retry = rows[np.maximum(np.abs(u[rows] - best_u[rows]), np.abs(v[rows] - best_v[rows])) >= self.tolerance]
+
+            improved = ~worse
+            active = active[improved]
+            S, Su, Sv, Suu, Suv, Svv, d = S[improved], Su[improved], Sv[improved], Suu[improved], Suv[improved], Svv[improved], d[improved]
+            ua, va = u[active], v[active]
+            best[active], best_u[active], best_v[active] = distances[improved], ua, va
+
+            gu = np.einsum("ij,ij->i", Su, d)
+            gv = np.einsum("ij,ij->i", Sv, d)
+            huu = np.einsum("ij,ij->i", Su, Su) + np.einsum("ij,ij->i", Suu, d)
+            huv = np.einsum("ij,ij->i", Su, Sv) + np.einsum("ij,ij->i", Suv, d)
+            hvv = np.einsum("ij,ij->i", Sv, Sv) + np.einsum("ij,ij->i", Svv, d)
+
+            # Fall back to Gauss-Newton where the Hessian is not positive definite.
+            det = huu * hvv - huv**2
+            indefinite = (det <= 0) | (huu <= 0)
+            huu = np.where(indefinite, np.einsum("ij,ij->i", Su, Su), huu)
+            huv = np.where(indefinite, np.einsum("ij,ij->i", Su, Sv), huv)
+            hvv = np.where(indefinite, np.einsum("ij,ij->i", Sv, Sv), hvv)
+            det = huu * hvv - huv**2
+            det = np.where(np.abs(det) > 1e-30, det, np.inf)
+
+            du = -(hvv * gu - huv * gv) / det
+            dv = -(huu * gv - huv * gu) / det
+
+            # On the edge of the domain, with the gradient pointing outwards, only the other parameter moves.
+            lock_u = ((ua <= u_min) & (gu > 0)) | ((ua >= u_max) & (gu < 0))
+            lock_v = ((va <= v_min) & (gv > 0)) | ((va >= v_max) & (gv < 0))
+            du = np.where(lock_u, 0.0, np.where(lock_v, -gu / np.maximum(huu, 1e-30), du))
+            dv = np.where(lock_v, 0.0, np.where(lock_u, -gv / np.maximum(hvv, 1e-30), dv))
+
+            u[active], v[active] = self.evaluator.clamp(ua + du, va + dv)
+            active = np.concatenate((active[np.maximum(np.abs(du), np.abs(dv)) >= self.tolerance], retry))
+
+        # The last steps have not been checked yet.
+        projected = self.evaluator.points_at(u, v)
+        differences = projected - points
+        worse = np.einsum("ij,ij->i", differences, differences) > best
+        if worse.any():
+            u[worse], v[worse] = best_u[worse], best_v[worse]
+            projected[worse] = self.evaluator.points_at(u[worse], v[worse])
+        return np.column_stack((u, v)), projected
+
+    def _lookup(self, keys: np.ndarray) -> tuple:
+        if not len(self._keys):
+            return np.zeros(len(keys), dtype=bool), np.zeros((0, 2))
+        if np.array_equal(keys, self._keys):
+            return np.ones(len(keys), dtype=bool), self._parameters
+
+        order = np.argsort(self._keys)
+        positions = np.clip(np.searchsorted(self._keys, keys, sorter=order), 0, len(order) - 1)
+        matches = order[positions]
+        known = self._keys[matches] == keys
+        return known, self._parameters[matches[known]]
+
+    def _store(self, keys: np.ndarray, parameters: np.ndarray) -> None:
+        if np.array_equal(keys, self._keys):
+            self._parameters = parameters
+            return
+
+        # Keep the parameters of vertices that were not part of this projection.
+        kept = ~np.isin(self._keys, keys)
+        self._keys = np.concatenate((self._keys[kept], keys))
+        self._parameters = np.concatenate((self._parameters[kept], parameters))
+
+
+class BoundaryProjector:
+    """
+    Batched projection onto a boundary polyline and its corner points.
+
+    The segments of the polyline are precomputed once (start points, segment vectors and
+    their squared lengths). Every segment is covered by evenly spaced sample points, at most
+    one typical segment length apart, which are stored in a KD-tree. Every point is tested
+    against the segments of its nearest samples only: any other segment is at least as far
+    away as the furthest of those samples minus half the sample spacing, so if the best
+    candidate is closer than that it is the closest segment. Otherwise, e.g. for points far
+    from a finely divided polyline, the test is repeated with more samples.
+
+    Parameters
+    ----------
+    polyline : Polyline, optional
+        The boundary polyline.
+    corners : list[Point], optional
+        The corner points.
+
+    Attributes
+    ----------
+    starts : numpy.ndarray
+        Start points of the segments, shape ``(s, 3)``.
+    vectors : numpy.ndarray
+        Segment vectors, shape ``(s, 3)``.
+    corner_points : numpy.ndarray
+        The corner points, shape ``(c, 3)``.
+
+    """
+
+    # The largest number of point-sample pairs tested at once.
+    CHUNK_SIZE = 2**20
+
+    def __init__(self, polyline=None, corners=None):
+        self.polyline = polyline
+        self.corners = corners
+
+        self.segment_tree = None
+        if polyline:
+            points = np.array([list(point) for point in polyline], dtype=float).reshape(-1, 3)
+            self._set_segments(points[:-1], points[1:] - points[:-1])
+
+        self.corner_tree = None
+        if corners:
+            self.corner_points = np.array([list(point) for point in corners], dtype=float).reshape(-1, 3)
+            self.corner_tree = cKDTree(self.corner_points)
+
+    @classmethod
+    def from_polylines(cls, polylines: list) -> "BoundaryProjector":
+        """Return a projector onto the nearest of several polylines, without segments between them."""
+        projector = cls()
+        points = [np.array([list(point) for point in polyline], dtype=float).reshape(-1, 3) for polyline in polylines]
+        if points:
+            projector._set_segments(np.concatenate([p[:-1] for p in points]), np.concatenate([p[1:] - p[:-1] for p in points]))
+        return projector
+
+    def _set_segments(self, starts: np.ndarray, vectors: np.ndarray) -> None:
+        self.starts = starts
+        self.vectors = vectors
+        self.squared_lengths = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        if len(self.starts):
+            self._build_segment_tree()
+
+    def _build_segment_tree(self) -> None:
+        lengths = np.sqrt(self.squared_lengths)
+        # Long segments get several samples, so that a few outliers do not widen every search,
+        # and the samples of a polyline with few long segments are not further apart than a
+        # fraction of its size, so that the searches of points far from it stay short.
+        size = float(np.linalg.norm(np.ptp(np.concatenate((self.starts, self.starts + self.vectors)), axis=0)))
+        self.spacing = max(min(float(np.median(lengths)), size / 256), 1e-12)
+        counts = np.maximum(np.ceil(lengths / self.spacing).astype(int), 1)
+
+        self.sample_segments = np.repeat(np.arange(len(lengths)), counts)
+        offsets = np.arange(len(self.sample_segments)) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = (offsets + 0.5) / counts[self.sample_segments]
+        samples = self.starts[self.sample_segments] + self.vectors[self.sample_segments] * t[:, None]
+        self.segment_tree = cKDTree(samples)
+
+    def project(self, points: np.ndarray, corner_mask: np.ndarray = None) -> np.ndarray:
+        """
+        Project points onto the polyline and snap the corner points to the nearest corner.
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            The points to project, shape ``(m, 3)``.
+        corner_mask : numpy.ndarray, optional
+            Boolean mask of the points to snap to the nearest corner
+            after they have been projected onto the polyline.
+
+        Returns
+        -------
+        numpy.ndarray
+            The projected points, shape ``(m, 3)``.
+
+        """
+        projected = np.array(points, dtype=float).reshape(-1, 3)
+
+        if self.segment_tree is not None and len(projected):
+            projected = self.project_to_polyline(projected)
+
+        if self.corner_tree is not None and corner_mask is not None and np.any(corner_mask):
+            _, nearest = self.corner_tree.query(projected[corner_mask])
+            projected[corner_mask] = self.corner_points[nearest]
+
+        return projected
+
+    def project_to_polyline(self, points: np.ndarray) -> np.ndarray:
+        """Return the closest points on the polyline, shape ``(m, 3)``."""
+        closest = np.empty_like(points)
+        rows = np.arange(len(points))
+        k = 16
+        while len(rows):
+            k = min(k, self.segment_tree.n)
+            remaining = []
+            # In chunks, so that many points with many samples do not exhaust the memory.
+            for chunk in np.array_split(rows, -(-len(rows) * k // self.CHUNK_SIZE)):
+                distances, samples = self.segment_tree.query(points[chunk], k=k)
+                distances, samples = distances.reshape(len(chunk), k), samples.reshape(len(chunk), k)
+                candidates, candidate_distances = self._closest_of_samples(points[chunk], samples)
+
+                # Every segment without any of the k nearest samples is at least this far away,
+                # because each point of a segment is within half the spacing of one of its samples.
+                done = (candidate_distances <= distances[:, -1] - 0.5 * self.spacing) | (k == self.segment_tree.n)
+                closest[chunk[done]] = candidates[done]
+                remaining.append(chunk[~done])
+            # The rest, e.g. points far from a densely sampled polyline, try again with more samples.
+            rows = np.concatenate(remaining)
+            k *= 4
+        return closest
+
+    def _closest_of_samples(self, points: np.ndarray, samples: np.ndarray) -> tuple:
+        """Return the closest points on the segments of the given samples of every point, and their distances."""
+        m, k = samples.shape
+        segments = self.sample_segments[samples]
+        closest = self._closest_on_segments(np.repeat(points, k, axis=0), segments.ravel()).reshape(m, k, 3)
+        differences = closest - points[:, None]
+        distances = np.sqrt(np.einsum("ijk,ijk->ij", differences, differences))
+
+        # Per point, pick the candidate with the smallest distance (ties go to the lowest segment index).
+        ties = distances == distances.min(axis=1)[:, None]
+        best = np.where(ties, segments, len(self.starts)).argmin(axis=1)
+        rows = np.arange(m)
+        return closest[rows, best], distances[rows, best]
+
+    def _closest_on_segments(self, points: np.ndarray, segments: np.ndarray) -> np.ndarray:
+        starts = self.starts[segments]
+        vectors = self.vectors[segments]
+        squared_lengths = self.squared_lengths[segments]
+        t = np.einsum("ij,ij->i", points - starts, vectors)
+        t = np.divide(t, squared_lengths, out=np.zeros_like(t), where=squared_lengths > 0)
+        return starts + vectors * np.clip(t, 0.0, 1.0)[:, None]
+
+
+class PlanarityProjector:
+    """
+    Batched projection of the vertices of every face towards the best-fit plane of the face.
+
+    The faces are grouped by their number of vertices. For every group, the covariance
+    matrices of all faces are stacked into one ``(f, 3, 3)`` array and decomposed in one
+    call; the eigenvector of the smallest eigenvalue is the normal of the least-squares plane
+    of the face. Every vertex is then moved towards the planes of its faces by the average of
+    its corrections. Triangles are always planar and are skipped, and so are the faces
+    without a free vertex, so a projector that serves only some meshes of a stacked topology
+    only works on their faces.
+
+    Parameters
+    ----------
+    strength : float, optional
+        The fraction of the averaged correction applied per projection, between 0 and 1.
+
+    Attributes
+    ----------
+    deviations : numpy.ndarray
+        The largest distance of a vertex from the best-fit plane of every face, measured before
+        the last projection, shape ``(f,)`` in the face order of the topology. 0 for the faces
+        that were skipped.
+
+    """
+
+    def __init__(self, strength: float = 1.0):
+        self.strength = strength
+        self.deviations = None
+        self._topology = None
+        self._groups = None
+        self._free = None
+        self._selection = None
+
+    def fit_planes(self, positions: np.ndarray, topology, free: np.ndarray = None) -> tuple:
+        """
+        Fit a plane to every non-triangular face, or only to those with a free vertex.
+
+        Returns
+        -------
+        list[tuple]
+            ``(faces, rows, centroids, normals, distances)`` per group of faces with the same
+            number of vertices: the face indices ``(g,)``, their vertex rows ``(g, k)``, the
+            plane origins ``(g, 3)`` and normals ``(g, 3)`` and the signed distances of the
+            vertices from the planes ``(g, k)``.
+
+        """
+        planes = []
+        groups = self._get_groups(topology) if free is None else self._select(topology, free)[0]
+        for faces, rows in groups:
+            corners = positions[rows]
+            centroids = corners.mean(axis=1)
+            centered = corners - centroids[:, None, :]
+            covariances = np.matmul(centered.transpose(0, 2, 1), centered)
+            # Eigenvalues in ascending order: the first eigenvector is the plane normal.
+            normals = np.linalg.eigh(covariances)[1][:, :, 0]
+            distances = np.einsum("fkj,fj->fk", centered, normals)
+            planes.append((faces, rows, centroids, normals, distances))
+        return planes
+
+    def face_deviations(self, positions: np.ndarray, topology) -> np.ndarray:
+        """Return the largest distance of a vertex from the best-fit plane of every face, shape ``(f,)``."""
+        deviations = np.zeros(topology.face_count)
+        for faces, _, _, _, distances in self.fit_planes(positions, topology):
+            deviations[faces] = np.abs(distances).max(axis=1)
+        return deviations
+
+    def project(self, positions: np.ndarray, topology, free: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Move the vertices towards the planes of their faces.
+
+        Parameters
+        ----------
+        positions : numpy.ndarray
+            The vertex positions, shape ``(n, 3)``.
+        topology : MeshTopology
+            The topology snapshot with the faces of the positions.
+        free : numpy.ndarray, optional
+            Boolean mask of the vertices that may move. Only the faces with a free vertex are fitted.
+        out : numpy.ndarray, optional
+            The array to write the projected positions to, e.g. ``positions`` to project in place.
+            Only the rows of the fitted faces are written.
+
+        Returns
+        -------
+        numpy.ndarray
+            The projected positions, shape ``(n, 3)``.
+
+        """
+        if free is None:
+            free = np.ones(len(positions), dtype=bool)
+        _, rows, inverse, counts = self._select(topology, free)
+
+        self.deviations = np.zeros(topology.face_count)
+        corrections = np.zeros((len(rows), 3))
+        offset = 0
+        for faces, face_rows, _, normals, distances in self.fit_planes(positions, topology, free):
+            self.deviations[faces] = np.abs(distances).max(axis=1)
+            moves = (-distances[:, :, None] * normals[:, None, :]).reshape(-1, 3)
+            local_rows = inverse[offset : offset + face_rows.size]
+            offset += face_rows.size
+            for axis in range(3):
+                corrections[:, axis] += np.bincount(local_rows, weights=moves[:, axis], minlength=len(rows))
+
+        projected = np.array(positions, dtype=float) if out is None else out
+        moved = free[rows]
+        projected[rows[moved]] += self.strength * corrections[moved] / counts[moved][:, None]
+        return projected
+
+    def _get_groups(self, topology) -> list:
+        if topology is not self._topology:
+            sizes = np.diff(topology.face_indptr)
+            self._groups = []
+            for size in np.unique(sizes[sizes > 3]):
+                faces = np.flatnonzero(sizes == size)
+                rows = topology.face_indices[topology.face_indptr[faces][:, None] + np.arange(size)]
+                self._groups.append((faces, rows))
+            self._topology = topology
+            self._selection = None
+        return self._groups
+
+    def _select(self, topology, free: np.ndarray) -> tuple:
+        # The groups of the faces with a free vertex, the rows of their vertices, the position of every
+        # face vertex in these rows, and the number of fitted faces of every row. Kept while ``free`` is the same.
+        groups = self._get_groups(topology)
+        if self._selection is None or not np.array_equal(free, self._free):
+            selected = []
+            for faces, rows in groups:
+                keep = free[rows].any(axis=1)
+                if keep.any():
+                    selected.append((faces[keep], rows[keep]))
+            face_rows = np.concatenate([rows.ravel() for _, rows in selected] or [np.zeros(0, dtype=int)])
+            rows, inverse, counts = np.unique(face_rows, return_inverse=True, return_counts=True)
+            self._selection = (selected, rows, inverse, counts)
+            self._free = np.array(free, dtype=bool)
+        return self._selection
@@ -0,0 +1,446 @@
+import numpy as np
+import scipy.sparse as sp
+from compas.datastructures import Mesh
+from compas.geometry import Vector
+from scipy.sparse.linalg import splu
+
+
+class MeshTopology:
+    """
+    Snapshot of the connectivity of a mesh.
+
+    The snapshot is built once and holds everything the relaxation needs to know about
+    the mesh that does not change while vertices move: the vertex order, the adjacency
+    in CSR form (``indptr`` / ``indices``), valences, the boundary, interior and corner
+    vertices and the fixed mask. All arrays are read-only. The connectivity is never
+    changed, a new snapshot is built for a changed mesh, but the fixed mask can change
+    without it, so it is replaced in place by :meth:`set_fixed` and :meth:`refresh_fixed`.
+
+    The snapshots of several meshes can be stacked into one with :meth:`stack`, whose arrays
+    describe all meshes as disconnected blocks, e.g. to relax many panels at once.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh to take the snapshot of.
+
+    Attributes
+    ----------
+    vertices : list[int]
+        The vertex keys, in array order.
+    vertex_keys : numpy.ndarray
+        The vertex keys, in array order, as an integer array.
+    index : dict[int, int]
+        Map from vertex key to array row.
+    indptr : numpy.ndarray
+        CSR row pointer of the vertex adjacency, shape ``(n + 1,)``.
+    indices : numpy.ndarray
+        CSR column indices (neighbor rows) of the vertex adjacency.
+    rows : numpy.ndarray
+        The row of every CSR entry, i.e. the vertex each neighbor belongs to.
+    valences : numpy.ndarray
+        Number of neighbors of every vertex.
+    boundary : numpy.ndarray
+        Boolean mask of the vertices on the mesh boundary.
+    fixed : numpy.ndarray
+        Boolean mask of the vertices with the ``fixed`` attribute set.
+    boundary_indices : numpy.ndarray
+        Rows of the boundary vertices.
+    interior_indices : numpy.ndarray
+        Rows of the interior vertices.
+    corner_indices : numpy.ndarray
+        Rows of the boundary vertices with only two neighbors.
+    modifier_mask : numpy.ndarray
+        Boolean mask of the vertices with more than two neighbors,
+        i.e. the vertices that modifiers apply forces to.
+    offsets : numpy.ndarray
+        The first row of every stacked mesh and the total row count, ``[0, n]`` for a single mesh.
+    face_keys : numpy.ndarray
+        The face keys, in array order.
+    face_index : dict[int, int]
+        Map from face key to array row.
+    face_indptr : numpy.ndarray
+        CSR row pointer of the face vertices, shape ``(f + 1,)``.
+    face_indices : numpy.ndarray
+        The vertex rows of all faces, in the cyclic order of every face.
+
+    """
+
+    def __init__(self, mesh: Mesh):
+        self.fingerprint = self.mesh_fingerprint(mesh)
+
+        self.vertices = list(mesh.vertices())
+        self.vertex_keys = np.array(self.vertices, dtype=int)
+        self.index = {vertex: i for i, vertex in enumerate(self.vertices)}
+
+        neighbors = [[self.index[nbr] for nbr in mesh.vertex_neighbors(vertex)] for vertex in self.vertices]
+        self.valences = np.array([len(nbrs) for nbrs in neighbors], dtype=int)
+        self.indptr = np.concatenate(([0], np.cumsum(self.valences)))
+        self.indices = np.array([i for nbrs in neighbors for i in nbrs], dtype=int)
+        self.rows = np.repeat(np.arange(len(self.vertices)), self.valences)
+
+        self.boundary = np.array([mesh.is_vertex_on_boundary(vertex) for vertex in self.vertices], dtype=bool)
+        self.fixed = self._read_fixed(mesh)
+        self.offsets = np.array([0, len(self.vertices)], dtype=int)
+
+        faces = list(mesh.faces())
+        face_vertices = [mesh.face_vertices(face) for face in faces]
+        self.face_keys = np.array(faces, dtype=int)
+        self.face_index = {face: i for i, face in enumerate(faces)}
+        self.face_indptr = np.concatenate(([0], np.cumsum([len(vertices) for vertices in face_vertices], dtype=int))).astype(int)
+        self.face_indices = np.array([self.index[vertex] for vertices in face_vertices for vertex in vertices], dtype=int)
+        self._finalize()
+
+    @classmethod
+    def stack(cls, topologies: list["MeshTopology"]) -> "MeshTopology":
+        """
+        Stack the snapshots of several meshes into one block-structured snapshot.
+
+        The rows of every mesh follow the rows of the previous ones (see ``offsets``) and the
+        neighbor indices are shifted accordingly. Vertex keys are not unique across the
+        meshes, so the stacked snapshot has no ``index`` and ``face_index``.
+        """
+        stacked = cls.__new__(cls)
+        stacked.fingerprint = tuple(topology.fingerprint for topology in topologies)
+        stacked.vertices = [vertex for topology in topologies for vertex in topology.vertices]
+        stacked.vertex_keys = np.array(stacked.vertices, dtype=int)
+        stacked.index = None
+
+        counts = [topology.vertex_count for topology in topologies]
+        stacked.offsets = np.concatenate(([0], np.cumsum(counts))).astype(int)
+        stacked.valences = np.concatenate([topology.valences for topology in topologies] or [np.zeros(0, dtype=int)])
+        stacked.indptr = np.concatenate(([0], np.cumsum(stacked.valences))).astype(int)
+        stacked.indices = np.concatenate([topology.indices + offset for topology, offset in zip(topologies, stacked.offsets)] or [np.zeros(0, dtype=int)])
+        stacked.rows = np.repeat(np.arange(len(stacked.vertices)), stacked.valences)
+        stacked.boundary = np.concatenate([topology.boundary for topology in topologies] or [np.zeros(0, dtype=bool)])
+        stacked.fixed = np.concatenate([topology.fixed for topology in topologies] or [np.zeros(0, dtype=bool)])
+
+        stacked.face_index = None
+        stacked.face_keys = np.concatenate([topology.face_keys for topology in topologies] or [np.zeros(0, dtype=int)])
+        face_sizes = np.concatenate([np.diff(topology.face_indptr) for topology in topologies] or [np.zeros(0, dtype=int)])
+        stacked.face_indptr = np.concatenate(([0], np.cumsum(face_sizes))).astype(int)
+        stacked.face_indices = np.concatenate([topology.face_indices + offset for topology, offset in zip(topologies, stacked.offsets)] or [np.zeros(0, dtype=int)])
+        stacked._finalize()
+        return stacked
+
+    def _finalize(self) -> None:
+        self.boundary_indices = np.flatnonzero(self.boundary)
+        self.interior_indices = np.flatnonzero(~self.boundary)
+        self.corner_indices = np.flatnonzero(self.boundary & (self.valences == 2))
+        self.modifier_mask = self.valences > 2
+
+        for array in (
+            self.vertex_keys,
+            self.valences,
+            self.indptr,
+            self.indices,
+            self.rows,
+            self.boundary,
+            self.fixed,
+            self.boundary_indices,
+            self.interior_indices,
+            self.corner_indices,
+            self.modifier_mask,
+            self.offsets,
+            self.face_keys,
+            self.face_indptr,
+            self.face_indices,
+        ):
+            array.flags.writeable = False
+
+    @staticmethod
+    def mesh_fingerprint(mesh: Mesh) -> tuple:
+        """
+        Return a cheap fingerprint of the connectivity of a mesh.
+
+        Adding or deleting vertices and faces changes the counts or bumps the
+        key counters of the mesh, so the fingerprint changes as well.
+        """
+        return (mesh.number_of_vertices(), mesh.number_of_faces(), mesh._max_vertex, mesh._max_face)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def face_count(self) -> int:
+        return len(self.face_keys)
+
+    @property
+    def mesh_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def matches(self, mesh: Mesh) -> bool:
+        """Return True if the connectivity of the mesh is unchanged since the snapshot."""
+        return self.fingerprint == self.mesh_fingerprint(mesh)
+
+    def _read_fixed(self, mesh: Mesh) -> np.ndarray:
+        return np.array([bool(mesh.vertex_attribute(vertex, "fixed")) for vertex in self.vertices], dtype=bool)
+
+    def set_fixed(self, fixed: np.ndarray) -> bool:
+        """Replace the fixed mask, in place, by a read-only copy of ``fixed``. Return True if it changed."""
+        fixed = np.array(fixed, dtype=bool)
+        if np.array_equal(fixed, self.fixed):
+            return False
+        fixed.flags.writeable = False
+        self.fixed = fixed
+        return True
+
+    def refresh_fixed(self, mesh: Mesh) -> bool:
+        """Re-read the ``fixed`` attribute of the vertices from the mesh. Return True if the mask changed."""
+        return self.set_fixed(self._read_fixed(mesh))
+
+    def rows_in(self, topology: "MeshTopology") -> np.ndarray:
+        """Return the row of every vertex in another snapshot of the same mesh, -1 for the vertices it does not have."""
+        return np.array([topology.index.get(vertex, -1) for vertex in self.vertices], dtype=int)
+
+    def keys(self, indices) -> list[int]:
+        """Return the vertex keys of the given rows."""
+        return [self.vertices[i] for i in indices]
+
+
+class MeshNormals:
+    """
+    Face and vertex normals of all faces and vertices, computed in one vectorized pass.
+
+    The normals are computed from a position array with the face connectivity of a
+    `MeshTopology` and cached: :meth:`update` only recomputes them when the positions differ
+    from the ones of the last update, so several modifiers of the same step (and later the
+    RF system) share one computation.
+
+    Parameters
+    ----------
+    topology : MeshTopology
+        The topology snapshot of the mesh.
+
+    Attributes
+    ----------
+    face_area_vectors : numpy.ndarray
+        Normal vectors of the faces with the length of the face area, shape ``(f, 3)``.
+    face_areas : numpy.ndarray
+        The lengths of the area vectors, shape ``(f,)``. This is the face area for planar
+        faces and slightly less for warped ones.
+    face_normals : numpy.ndarray
+        The unit face normals, shape ``(f, 3)``.
+    vertex_normals : numpy.ndarray
+        The unit vertex normals, the area-weighted average of the normals of the faces of every vertex, shape ``(n, 3)``.
+    vertex_area_vectors : numpy.ndarray
+        The face area vectors distributed evenly to the vertices of every face, shape ``(n, 3)``.
+
+    """
+
+    def __init__(self, topology: MeshTopology):
+        self.topology = topology
+        sizes = np.diff(topology.face_indptr)
+        self._face_rows = np.repeat(np.arange(topology.face_count), sizes)
+        self._face_sizes = sizes
+        # The entry of the next vertex around the face of every entry.
+        entries = np.arange(len(topology.face_indices))
+        last = np.repeat(topology.face_indptr[1:] - 1, sizes)
+        self._next_entries = np.where(entries == last, np.repeat(topology.face_indptr[:-1], sizes), entries + 1)
+        self._positions = None
+
+    def invalidate(self) -> None:
+        """Recompute the normals on the next update, whatever the positions."""
+        self._positions = None
+
+    def update(self, positions: np.ndarray) -> "MeshNormals":
+        """Recompute the normals if the positions have changed since the last update, and return the cache."""
+        if self._positions is not None and self._positions.shape == positions.shape and np.array_equal(self._positions, positions):
+            return self
+
+        topology = self.topology
+        n, f = topology.vertex_count, topology.face_count
+        corners = positions[topology.face_indices]
+
+        centroids = np.zeros((f, 3))
+        for axis in range(3):
+            centroids[:, axis] = np.bincount(self._face_rows, weights=corners[:, axis], minlength=f)
+        centroids /= np.maximum(self._face_sizes, 1)[:, None]
+
+        # Polygon area vector: half the sum of the cross products of the triangles fanned from the centroid.
+        to_corner = corners - centroids[self._face_rows]
+        to_next = positions[topology.face_indices[self._next_entries]] - centroids[self._face_rows]
+        crosses = np.cross(to_corner, to_next)
+        self.face_area_vectors = np.zeros((f, 3))
+        for axis in range(3):
+            self.face_area_vectors[:, axis] = 0.5 * np.bincount(self._face_rows, weights=crosses[:, axis], minlength=f)
+        self.face_areas = np.linalg.norm(self.face_area_vectors, axis=1)
+        self.face_normals = self._unitized(self.face_area_vectors, self.face_areas)
+
+        area_vectors = self.face_area_vectors[self._face_rows]
+        shares = area_vectors / self._face_sizes[self._face_rows][:, None]
+        weighted = np.zeros((n, 3))
+        self.vertex_area_vectors = np.zeros((n, 3))
+        for axis in range(3):
+            weighted[:, axis] = np.bincount(topology.face_indices, weights=area_vectors[:, axis], minlength=n)
+            self.vertex_area_vectors[:, axis] = np.bincount(topology.face_indices, weights=shares[:, axis], minlength=n)
+        self.vertex_normals = self._unitized(weighted, np.linalg.norm(weighted, axis=1))
+
+        self._positions = positions.copy()
+        return self
+
+    @staticmethod
+    def _unitized(vectors: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        return np.divide(vectors, lengths[:, None], out=np.zeros_like(vectors), where=lengths[:, None] > 0)
+
+
+class RelaxEngine:
+    """
+    Array-backed state of a mesh relaxation.
+
+    The vertex positions are packed into an ``(n, 3)`` array once, and the adjacency is
+    taken from a `MeshTopology` snapshot. Every relaxation step then runs as a handful of
+    vectorized array operations instead of per-vertex calls into the `Mesh` API.
+    Coordinates are only written back to the mesh when :meth:`write_positions` is called.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh whose vertex positions are packed.
+    topology : MeshTopology, optional
+        The topology snapshot of the mesh. Built from the mesh if not provided.
+
+    Attributes
+    ----------
+    topology : MeshTopology
+        The topology snapshot of the mesh.
+    positions : numpy.ndarray
+        Vertex coordinates, shape ``(n, 3)``.
+    forces : numpy.ndarray
+        Accumulated vertex forces, shape ``(n, 3)``.
+
+    """
+
+    def __init__(self, mesh: Mesh, topology: MeshTopology = None):
+        self.reset(mesh, topology)
+
+    @classmethod
+    def stack(cls, meshes: list[Mesh], topologies: list[MeshTopology], stacked: MeshTopology = None) -> "RelaxEngine":
+        """Pack the vertex positions of several meshes into one engine over their stacked topology."""
+        engine = cls.__new__(cls)
+        engine.topology = stacked or MeshTopology.stack(topologies)
+        positions = [RelaxEngine(mesh, topology).positions for mesh, topology in zip(meshes, topologies)]
+        engine.positions = np.concatenate(positions or [np.zeros((0, 3))])
+        engine.forces = np.zeros_like(engine.positions)
+        return engine
+
+    def reset(self, mesh: Mesh, topology: MeshTopology = None) -> None:
+        """Re-pack the vertex positions of the mesh, e.g. after its connectivity changed."""
+        self.topology = topology or MeshTopology(mesh)
+
+        vertices = self.topology.vertices
+        self.positions = np.array([mesh.vertex_coordinates(vertex) for vertex in vertices], dtype=float).reshape(-1, 3)
+        self.forces = np.zeros_like(self.positions)
+
+    @property
+    def vertex_count(self) -> int:
+        return self.topology.vertex_count
+
+    # --------------------------------------------------------------------------
+    # Relaxation steps
+    # --------------------------------------------------------------------------
+
+    def compute_forces(self, damping: float) -> np.ndarray:
+        """
+        Compute the spring forces of all vertices.
+
+        Every vertex is pulled towards its neighbors by the edge vectors scaled by their
+        length, averaged over the valence and scaled by ``damping``. Vertices with two
+        neighbors (the corners of a quad grid) receive no force.
+        """
+        topology = self.topology
+        edge_vectors = self.positions[topology.indices] - self.positions[topology.rows]
+        edge_lengths = np.sqrt(np.einsum("ij,ij->i", edge_vectors, edge_vectors))
+
+        valences = topology.valences[topology.rows]
+        weights = edge_lengths * damping / valences
+        contributions = edge_vectors * weights[:, None]
+
+        for axis in range(3):
+            self.forces[:, axis] = np.bincount(topology.rows, weights=contributions[:, axis], minlength=self.vertex_count)
+
+        self.forces[topology.valences == 2] = 0.0
+        return self.forces
+
+    def apply_forces(self) -> np.ndarray:
+        """Move all free vertices by their accumulated force."""
+        free = ~self.topology.fixed
+        self.positions[free] += self.forces[free]
+        return self.positions
+
+    # --------------------------------------------------------------------------
+    # Mesh synchronization
+    # --------------------------------------------------------------------------
+
+    def write_positions(self, mesh: Mesh) -> None:
+        """Write the packed vertex coordinates back to the mesh."""
+        for vertex, xyz in zip(self.topology.vertices, self.positions.tolist()):
+            mesh.vertex_attributes(vertex, "xyz", xyz)
+
+    def write_forces(self, mesh: Mesh) -> None:
+        """Write the packed vertex forces to the ``force`` attribute of the mesh."""
+        for vertex, force in zip(self.topology.vertices, self.forces.tolist()):
+            mesh.vertex_attribute(vertex, "force", Vector(*force))
+
+    def read_forces(self, mesh: Mesh) -> None:
+        """Read the ``force`` attribute of the mesh back into the packed forces."""
+        for i, vertex in enumerate(self.topology.vertices):
+            force = mesh.vertex_attribute(vertex, "force")
+            if force is not None:
+                self.forces[i] = list(force)
+
+
+class ImplicitSolver:
+    """
+    Implicit (backward Euler) umbrella smoothing with a cached sparse factorization.
+
+    Every step solves ``(I - step * L) x = x0 + f`` for the free vertices, where ``L`` is
+    the uniform umbrella operator of the mesh, ``x0`` the current positions and ``f`` the
+    external forces. Constrained vertices are eliminated from the system and enter the
+    right-hand side with their current positions. The operator only depends on the topology,
+    the constrained vertices and the step, so it is assembled and factorized once and reused
+    for every step and every call to :meth:`solve` with the same configuration.
+
+    Parameters
+    ----------
+    topology : MeshTopology
+        The topology snapshot of the mesh.
+    constrained : numpy.ndarray
+        Boolean mask of the vertices held at their current position during the solve.
+    step : float
+        The implicit time step. Larger values smooth more per step.
+
+    """
+
+    def __init__(self, topology: MeshTopology, constrained: np.ndarray, step: float):
+        self.topology = topology
+        self.constrained = np.array(constrained, dtype=bool)
+        # Vertices without neighbors have an empty umbrella, so they are held as well.
+        self.constrained |= topology.valences == 0
+        self.step = step
+
+        self.free = np.flatnonzero(~self.constrained)
+        self.held = np.flatnonzero(self.constrained)
+
+        n = topology.vertex_count
+        weights = 1.0 / topology.valences[topology.rows]
+        umbrella = sp.csr_matrix((weights, topology.indices, topology.indptr), shape=(n, n)) - sp.identity(n, format="csr")
+        system = (sp.identity(n, format="csr") - step * umbrella).tocsr()
+
+        self.system_held = system[self.free][:, self.held]
+        self.factorization = splu(system[self.free][:, self.free].tocsc()) if len(self.free) else None
+
+    def matches(self, topology: MeshTopology, constrained: np.ndarray, step: float) -> bool:
+        """Return True if the factorization can be reused for this configuration."""
+        constrained = np.asarray(constrained, dtype=bool) | (topology.valences == 0)
+        return topology is self.topology and step == self.step and np.array_equal(constrained, self.constrained)
+
+    def solve(self, positions: np.ndarray, forces: np.ndarray) -> np.ndarray:
+        """Update the free rows of ``positions`` in place by one implicit step."""
+        if self.factorization is None:
+            return positions
+
+        rhs = positions[self.free] + forces[self.free] - self.system_held @ positions[self.held]
+        positions[self.free] = self.factorization.solve(rhs)
+        return positions
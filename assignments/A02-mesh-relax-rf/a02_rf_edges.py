@@ -0,0 +1,167 @@
+import numpy as np
+from compas.datastructures import Mesh
+from compas.geometry import Line
+from compas.geometry import Vector
+
+
+class RFEdgeArrays:
+    """
+    Columnar storage of the RF edge attributes of a mesh.
+
+    Instead of one attribute dict per edge, every attribute is one contiguous array with
+    a row per edge, in the order of ``mesh.edges()``. The arrays are exposed as they are,
+    so vectorized code reads and writes them without copies, while :meth:`get` and
+    :meth:`set` serve the usual per-edge attribute API and build the COMPAS objects only
+    when they are asked for.
+
+    Copies made with :meth:`copy` share all arrays. Shared arrays are read-only, and the
+    first write to one of them through :meth:`writable` (which :meth:`set` and
+    :meth:`set_neighbors` use) clones it, so the topology and neighbor tables, which are
+    not written after the RF datastructure is built, stay shared between all copies.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh whose edges are the RF members.
+
+    Attributes
+    ----------
+    edges : list[tuple[int, int]]
+        The edges, in the row order of the arrays, which is also the order of per-edge
+        input arrays. This is the order of ``mesh.edges()`` of the mesh the store was built
+        from, and of the meshes of `RFSystem` copies, which keep the edge order.
+    vertices : numpy.ndarray
+        The same edges as an array of vertex keys, shape ``(m, 2)``.
+    centerlines : numpy.ndarray
+        Start and end point of the centerline of every edge, shape ``(m, 2, 3)``.
+    normals : numpy.ndarray
+        Orientation normal of every edge, shape ``(m, 3)``. NaN for edges without normal.
+    next_edges, prev_edges : numpy.ndarray
+        The neighboring RF halfedges as vertex pairs, shape ``(m, 2)``. -1 for edges without neighbors.
+    next_indices, prev_indices : numpy.ndarray
+        The rows of the neighboring RF edges, shape ``(m,)``. -1 for edges without neighbors.
+    beams : numpy.ndarray
+        The beam of every edge, an object array of shape ``(m,)``.
+    interior : numpy.ndarray
+        True for the edges with a face on both sides.
+
+    """
+
+    COLUMNS = ("centerline", "normal", "next_edge", "prev_edge", "beam")
+    # The arrays that are shared between copies until one of them writes to it.
+    ARRAYS = ("vertices", "centerlines", "normals", "next_edges", "prev_edges", "next_indices", "prev_indices", "beams", "interior")
+
+    def __init__(self, mesh: Mesh):
+        self.edges = list(mesh.edges())
+        self.index = {}
+        for row, (u, v) in enumerate(self.edges):
+            self.index[u, v] = row
+            self.index[v, u] = row
+
+        self.vertices = np.array(self.edges, dtype=int).reshape(-1, 2)
+        count = len(self.edges)
+        self.centerlines = np.full((count, 2, 3), np.nan)
+        self.normals = np.full((count, 3), np.nan)
+        self.next_edges = np.full((count, 2), -1, dtype=int)
+        self.prev_edges = np.full((count, 2), -1, dtype=int)
+        self.next_indices = np.full(count, -1, dtype=int)
+        self.prev_indices = np.full(count, -1, dtype=int)
+        self.beams = np.full(count, None, dtype=object)
+        self.interior = np.array([not mesh.is_edge_on_boundary(edge) for edge in self.edges], dtype=bool)
+
+    @classmethod
+    def from_mesh_attributes(cls, mesh: Mesh, names: tuple = COLUMNS) -> "RFEdgeArrays":
+        """Collect the given RF attributes stored on the edges of the mesh."""
+        arrays = cls(mesh)
+        for name in names:
+            values = [mesh.edge_attribute(edge, name) for edge in arrays.edges]
+            rows = [row for row, value in enumerate(values) if value is not None]
+            if rows:
+                arrays.set_rows(name, rows, [values[row] for row in rows])
+        return arrays
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    @property
+    def starts(self) -> np.ndarray:
+        """The start points of the centerlines, a view of shape ``(m, 3)``."""
+        return self.centerlines[:, 0]
+
+    @property
+    def ends(self) -> np.ndarray:
+        """The end points of the centerlines, a view of shape ``(m, 3)``."""
+        return self.centerlines[:, 1]
+
+    def set_neighbors(self, rows, next_edges, prev_edges) -> None:
+        """Store the next and previous RF halfedges of many edges at once."""
+        rows = np.asarray(rows, dtype=int)
+        self.writable("next_edges")[rows] = next_edges
+        self.writable("prev_edges")[rows] = prev_edges
+        self.writable("next_indices")[rows] = [self.index[edge] for edge in map(tuple, np.asarray(next_edges).tolist())]
+        self.writable("prev_indices")[rows] = [self.index[edge] for edge in map(tuple, np.asarray(prev_edges).tolist())]
+
+    def get(self, edge, name: str):
+        """Return one attribute of one edge as a COMPAS object, or None if it is not set."""
+        row = self.index[tuple(edge)]
+        if name == "centerline":
+            start, end = self.centerlines[row].tolist()
+            return None if np.isnan(start[0]) else Line(start, end)
+        if name == "normal":
+            normal = self.normals[row].tolist()
+            return None if np.isnan(normal[0]) else Vector(*normal)
+        if name in ("next_edge", "prev_edge"):
+            u, v = (self.next_edges if name == "next_edge" else self.prev_edges)[row].tolist()
+            return None if u < 0 else (u, v)
+        if name == "beam":
+            return self.beams[row]
+        raise KeyError(f"RFEdgeArrays has no column {name!r}.")
+
+    def set(self, edge, name: str, value) -> None:
+        """Set one attribute of one edge, or unset it with None."""
+        self.set_rows(name, [self.index[tuple(edge)]], [value])
+
+    def set_rows(self, name: str, rows, values) -> None:
+        """Set one attribute of the edges in the given rows, None unsets it."""
+        if name == "centerline":
+            # The start point and the vector are stored on the Line, its end would be computed.
+            lines = [[*value.point, *value.vector] if value is not None else [np.nan] * 6 for value in values]
+            lines = np.array(lines, dtype=float).reshape(-1, 2, 3)
+            lines[:, 1] += lines[:, 0]
+            self.writable("centerlines")[rows] = lines
+        elif name == "normal":
+            self.writable("normals")[rows] = [list(value) if value is not None else [np.nan] * 3 for value in values]
+        elif name in ("next_edge", "prev_edge"):
+            prefix = name.split("_")[0]
+            self.writable(f"{prefix}_edges")[rows] = [tuple(value) if value is not None else (-1, -1) for value in values]
+            self.writable(f"{prefix}_indices")[rows] = [self.index[tuple(value)] if value is not None else -1 for value in values]
+        elif name == "beam":
+            beams = self.writable("beams")
+            for row, value in zip(rows, values):
+                beams[row] = value
+        else:
+            raise KeyError(f"RFEdgeArrays has no column {name!r}.")
+
+    def copy(self) -> "RFEdgeArrays":
+        """Return a copy that shares all arrays with this one until either of them writes to an array."""
+        arrays = RFEdgeArrays.__new__(RFEdgeArrays)
+        # The edges and the index are never written, they are always shared.
+        arrays.edges = self.edges
+        arrays.index = self.index
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array.flags.writeable = False
+            setattr(arrays, name, array)
+        return arrays
+
+    def writable(self, name: str) -> np.ndarray:
+        """Return the array ``name`` for writing, after cloning it if it is shared with a copy."""
+        array = getattr(self, name)
+        if not array.flags.writeable:
+            array = array.copy()
+            setattr(self, name, array)
+        return array
+
+    def lines(self) -> list[Line]:
+        """Return the centerlines of all edges as `Line` objects."""
+        return [Line(start, end) for start, end in self.centerlines.tolist()]
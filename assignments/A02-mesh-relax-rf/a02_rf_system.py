@@ -1,17 +1,54 @@
-# ========================================================================
-# CHALLENGE 01: Attractors
-# To complete this challenge:
-# 1. Implement the methods `eccentrize_centerlines_attractor_point`
-#    and `eccentrize_centerlines_attractor_curve` located below.
-# 2. Once implemented, apply these methods within the `RF System` section
-#    of the Grasshopper canvas.
-# ========================================================================
+from copy import deepcopy
+
+import numpy as np
+from a02_attractors import CurveAttractor
+from a02_attractors import PointAttractor
+from a02_relax_engine import MeshNormals
+from a02_relax_engine import MeshTopology
+from a02_rf_edges import RFEdgeArrays
 from compas.datastructures import Mesh
-from compas.geometry import Line
 from compas.geometry import Point
 from compas.geometry import Vector
 
 
+def copy_mesh(mesh: Mesh, skip: tuple = ()) -> Mesh:
+    """
+    Return a copy of a mesh with its vertices, faces and edges in the same order.
+
+    `Mesh.copy` rebuilds the halfedges face by face, which changes the order of
+    ``mesh.edges()`` when faces were deleted, so the rows of per-edge arrays would no
+    longer match. This copies the connectivity as it is and all attributes, deep-copying
+    the values that are not plain numbers or strings.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh to copy.
+    skip : tuple[str], optional
+        Names of edge attributes that are left out of the copy.
+
+    """
+    copy = type(mesh)(
+        default_vertex_attributes=deepcopy(mesh.default_vertex_attributes),
+        default_edge_attributes=deepcopy(mesh.default_edge_attributes),
+        default_face_attributes=deepcopy(mesh.default_face_attributes),
+        name=mesh._name,
+    )
+    copy.attributes.update(deepcopy(mesh.attributes))
+    copy.vertex = {vertex: _copy_attributes(attributes) for vertex, attributes in mesh.vertex.items()}
+    copy.face = {face: list(vertices) for face, vertices in mesh.face.items()}
+    copy.halfedge = {vertex: dict(neighbors) for vertex, neighbors in mesh.halfedge.items()}
+    copy.facedata = {face: _copy_attributes(attributes) for face, attributes in mesh.facedata.items()}
+    copy.edgedata = {edge: _copy_attributes(attributes, skip) for edge, attributes in mesh.edgedata.items()}
+    copy._max_vertex = mesh._max_vertex
+    copy._max_face = mesh._max_face
+    return copy
+
+
+def _copy_attributes(attributes: dict, skip: tuple = ()) -> dict:
+    return {name: value if type(value) in (bool, int, float, str) else deepcopy(value) for name, value in attributes.items() if name not in skip}
+
+
 class RFSystem:
     """
     Reciprocal-frame helper built on top of a COMPAS mesh.
@@ -22,18 +59,69 @@ class RFSystem:
     - ``centerline``: geometric line used to create a beam
     - ``normal``: orientation vector for the beam cross-section
     - ``next_edge`` / ``prev_edge``: neighboring RF edges around the local face
+
+    With ``columnar=True`` these attributes are kept in the arrays of an `RFEdgeArrays`
+    instead (``edge_arrays``), and :meth:`edge_attribute` and :attr:`centerlines` serve them
+    from there. The mesh then has none of these attributes. Copies made with :meth:`copy`
+    always use the columnar store.
     """
 
-    def __init__(self, mesh: Mesh):
+    def __init__(self, mesh: Mesh, columnar: bool = False):
         self.mesh = mesh
+        self.columnar = columnar
+        self.edge_arrays = None
         self.timber_model = None
+        self._normals = None
 
     @property
     def centerlines(self) -> list:
+        if self.edge_arrays is not None:
+            return self.edge_arrays.lines()
         return [self.mesh.edge_attribute(edge, "centerline") for edge in self.mesh.edges()]
 
+    def edge_attribute(self, edge, name: str, value=None):
+        """Get or set an RF attribute of an edge, like ``mesh.edge_attribute``, from the columnar arrays if they are used."""
+        if self.edge_arrays is None or name not in RFEdgeArrays.COLUMNS:
+            return self.mesh.edge_attribute(edge, name, value)
+        if value is None:
+            return self.edge_arrays.get(edge, name)
+        self.edge_arrays.set(edge, name, value)
+
+    @property
+    def normals(self) -> MeshNormals:
+        """Return the face and vertex normals of the mesh, recomputed only if the mesh has changed."""
+        if self._normals is None or not self._normals.topology.matches(self.mesh):
+            self._normals = MeshNormals(MeshTopology(self.mesh))
+        return self._normals.update(self._vertex_positions(self._normals.topology))
+
+    def _vertex_positions(self, topology: MeshTopology) -> np.ndarray:
+        return np.array([self.mesh.vertex_coordinates(vertex) for vertex in topology.vertices], dtype=float).reshape(-1, 3)
+
     def copy(self) -> "RFSystem":
-        return RFSystem(mesh=self.mesh.copy())
+        """
+        Return a lightweight copy, e.g. to try a variant in every Grasshopper branch.
+
+        The copy has its own mesh, with the vertices, faces and edges in the same order, and
+        uses the columnar store (see `RFEdgeArrays`) for its RF attributes. The arrays of the
+        store are shared with this system and cloned only when one of the systems first writes
+        to them, so the topology and neighbor tables stay shared, and only the centerlines of a
+        copy are cloned when it is eccentrized. The ``beam`` objects are shared as well, set a
+        new beam on a copy instead of changing a shared one.
+
+        A system without the columnar store is not changed: the store of the copy is collected
+        from the RF attributes on its mesh, which are left out of the mesh of the copy.
+        """
+        if self.edge_arrays is not None:
+            edge_arrays = self.edge_arrays.copy()
+        else:
+            edge_arrays = RFEdgeArrays.from_mesh_attributes(self.mesh)
+
+        system = RFSystem(mesh=copy_mesh(self.mesh, skip=RFEdgeArrays.COLUMNS), columnar=True)
+        system.edge_arrays = edge_arrays
+        if self._normals is not None:
+            # The topology snapshot is only read, the normals of the copy are computed on their own.
+            system._normals = MeshNormals(self._normals.topology)
+        return system
 
     # --------------------------------------------------------------------------
     # RF DATASTRUCTURE SETUP
@@ -43,148 +131,236 @@ class RFSystem:
         """
         Compute and store all RF edge attributes.
         """
-        # Initialize centerline + normal for every edge.
-        for edge in self.mesh.edges():
+        mesh = self.mesh
+        # All face normals in one pass, the edge normals below only look them up.
+        normals = self.normals
+        next_halfedges, halfedge_faces = self._halfedge_tables(normals.topology)
+
+        edges = list(mesh.edges())
+        # Boundary edges are valid members, but they have incomplete RF neighborhood data,
+        # so we can skip computing those attributes for them.
+        interior = [edge for edge in edges if edge in next_halfedges and edge[::-1] in next_halfedges]
+
+        # Interior edges use the average of the two neighboring face normals.
+        face_normals = normals.face_normals
+        edge_normals = face_normals[[halfedge_faces[edge] for edge in interior]] + face_normals[[halfedge_faces[edge[::-1]] for edge in interior]]
+        # Reversing first, then taking "next", is a neat way to get the previous RF relation.
+        next_edges = [next_halfedges[edge] for edge in interior]
+        prev_edges = [next_halfedges[edge[::-1]] for edge in interior]
+
+        if self.columnar:
+            self._store_edge_arrays(normals.topology, edges, interior, edge_normals, next_edges, prev_edges)
+            return
+
+        self.edge_arrays = None
+        for edge in edges:
             self._set_centerline(edge)
+        for edge, normal, next_edge, prev_edge in zip(interior, edge_normals.tolist(), next_edges, prev_edges):
+            # Unitized by compas rather than numpy, which can differ in the last bit.
+            normal = Vector(*normal)
+            normal.unitize()
+            mesh.edge_attribute(edge, "normal", normal)
+            mesh.edge_attribute(edge, "next_edge", next_edge)
+            mesh.edge_attribute(edge, "prev_edge", prev_edge)
+
+    def _store_edge_arrays(self, topology: MeshTopology, edges: list, interior: list, edge_normals, next_edges: list, prev_edges: list) -> None:
+        """Write all RF edge attributes into a new `RFEdgeArrays` in bulk."""
+        arrays = RFEdgeArrays(self.mesh)
+        positions = self._vertex_positions(topology)
+        if edges:
+            arrays.centerlines[:] = positions[[[topology.index[u], topology.index[v]] for u, v in edges]]
+
+        if interior:
+            rows = [arrays.index[edge] for edge in interior]
+            arrays.normals[rows] = edge_normals / np.linalg.norm(edge_normals, axis=1)[:, None]
+            arrays.set_neighbors(rows, next_edges, prev_edges)
+        self.edge_arrays = arrays
+
+    def _halfedge_tables(self, topology: MeshTopology) -> tuple:
+        """
+        Walk every face cycle once.
 
-            # Boundary edges are valid members, but they have incomplete RF neighborhood data,
-            # so we can skip computing those attributes for them.
-            if self.mesh.is_edge_on_boundary(edge):
-                continue
+        Returns
+        -------
+        tuple[dict, dict]
+            The next halfedge around the face of every halfedge, and the row of that face in the topology.
 
-            self._set_normal(edge)
-            self._set_edge_neighborhood(edge)
+        """
+        next_halfedges = {}
+        halfedge_faces = {}
+        for face in self.mesh.faces():
+            halfedges = self.mesh.face_halfedges(face)
+            row = topology.face_index[face]
+            for halfedge, next_halfedge in zip(halfedges, halfedges[1:] + halfedges[:1]):
+                next_halfedges[halfedge] = next_halfedge
+                halfedge_faces[halfedge] = row
+        return next_halfedges, halfedge_faces
 
     def _set_centerline(self, edge) -> None:
         """Store the geometric line representation of a mesh edge."""
-        self.mesh.edge_attribute(edge, "centerline", self.mesh.edge_line(edge))
-
-    def _set_normal(self, edge) -> None:
-        """Store an orientation normal for an edge (averaged on interior edges, single-face on boundary)."""
-        self.mesh.edge_attribute(edge, "normal", self._compute_edge_normal(edge))
-
-    def _set_edge_neighborhood(self, edge) -> None:
-        next_edge = self._compute_next_rf_edge(edge)
-        prev_edge = self._compute_prev_rf_edge(edge)
-
-        # Store local RF connectivity for interior edges
-        self.mesh.edge_attribute(edge, "next_edge", next_edge)
-        self.mesh.edge_attribute(edge, "prev_edge", prev_edge)
-
-    def _compute_next_rf_edge(self, edge):
-        """Return the next halfedge around the face of the given halfedge."""
-        face = self.mesh.halfedge_face(edge)
-        halfedges = self.mesh.face_halfedges(face)
-        index = halfedges.index(edge)
-        return halfedges[(index + 1) % len(halfedges)]
-
-    def _compute_prev_rf_edge(self, edge):
-        """Return the previous RF edge by walking the opposite halfedge's face cycle."""
-        reversed_edge = (edge[1], edge[0])
-        # Reversing first, then taking "next", is a neat way to get the previous RF relation
-        return self._compute_next_rf_edge(reversed_edge)
-
-    def _compute_edge_normal(self, edge) -> Vector:
-        """
-        Compute an edge orientation vector.
-
-        Interior edges use the average of the two neighboring face normals.
-        Boundary edges use the single adjacent face normal.
-        """
-        face_a, face_b = self.mesh.edge_faces(edge)
-        normal_a = self.mesh.face_normal(face_a)
-        normal_b = self.mesh.face_normal(face_b)
-
-        edge_normal = normal_a + normal_b
-        edge_normal.unitize()
-
-        return edge_normal
+        self.edge_attribute(edge, "centerline", self.mesh.edge_line(edge))
 
     # --------------------------------------------------------------------------
     # RF SYSTEM CENTERLINES ROTATION
     # --------------------------------------------------------------------------
 
-    def eccentrize_centerlines(self, eccentricity: float) -> Mesh:
+    def eccentrize_centerlines(self, eccentricity) -> Mesh:
         """
         Shift interior centerlines so beams overlap like a reciprocal frame.
 
         Positive values push line ends in the local RF directions.
-        """
-        for edge in self.mesh.edges():
-            if self.mesh.is_edge_on_boundary(edge):
-                continue
-
-            next_edge = self.mesh.edge_attribute(edge, "next_edge")
-            prev_edge = self.mesh.edge_attribute(edge, "prev_edge")
-            centerline = self.mesh.edge_attribute(edge, "centerline")
-
-            next_direction = self.mesh.edge_direction(next_edge).unitized()
-            prev_direction = self.mesh.edge_direction(prev_edge).unitized()
 
-            start_shift = prev_direction * eccentricity
-            end_shift = (-start_shift) + next_direction * eccentricity
+        Parameters
+        ----------
+        eccentricity : float | numpy.ndarray
+            One value for all edges, or one value per edge in the order of ``mesh.edges()``,
+            e.g. a field computed from the curvature or the stresses, or a start and an end
+            value per edge, shape ``(m, 2)``, e.g. from :meth:`attractor_eccentricities`.
 
-            centerline.start += start_shift
-            centerline.end += end_shift
-            self.mesh.edge_attribute(edge, "centerline", centerline)
+        Returns
+        -------
+        Mesh
+            The mesh, with the eccentrized centerlines on its edges.
 
+        """
+        arrays = self._centerline_arrays()
+        values = np.asarray(eccentricity, dtype=float)
+        if values.shape == (len(arrays), 2):
+            self._eccentrize(arrays, values[:, 0], values[:, 1])
+        else:
+            values = self._edge_values(values, "eccentricity", len(arrays))
+            self._eccentrize(arrays, values, values)
         return self.mesh
 
-    def extend_centerlines(self, extension: float) -> None:
+    def extend_centerlines(self, extension) -> None:
         """
         Extend interior centerlines and trim them at adjacent boundary edges when needed.
+
+        Parameters
+        ----------
+        extension : float | numpy.ndarray
+            One value for all edges, or one value per edge in the order of ``mesh.edges()``.
+
         """
-        for edge in self.mesh.edges():
-            if self.mesh.is_edge_on_boundary(edge):
-                continue
-            extend_start = not self.mesh.is_vertex_on_boundary(edge[0])
-            extend_end = not self.mesh.is_vertex_on_boundary(edge[1])
+        arrays = self._centerline_arrays()
+        values = self._edge_values(extension, "extension", len(arrays))
+        rows = np.flatnonzero(arrays.interior)
+        if not len(rows):
+            return
+
+        # Ends on the boundary are not extended.
+        lookup, positions = self._vertex_table()
+        on_boundary = np.zeros(len(positions), dtype=bool)
+        on_boundary[lookup[[vertex for boundary in self.mesh.vertices_on_boundaries() for vertex in boundary]]] = True
+        extend = ~on_boundary[lookup[arrays.vertices[rows]]]
+
+        centerlines = arrays.centerlines[rows]
+        directions = centerlines[:, 1] - centerlines[:, 0]
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+        shifts = directions * values[rows, None]
+        centerlines[:, 0] -= shifts * extend[:, 0:1]
+        centerlines[:, 1] += shifts * extend[:, 1:2]
+        self._write_centerlines(arrays, rows, centerlines)
+
+    @staticmethod
+    def _edge_values(values, name: str, count: int) -> np.ndarray:
+        """Broadcast a scalar to one value per edge, or check that there is one value per edge."""
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0:
+            return np.full(count, float(values))
+        if values.shape != (count,):
+            raise ValueError(f"Expected a scalar or one {name} per edge ({count}), got an array of shape {values.shape}.")
+        return values
+
+    def _eccentrize(self, arrays: RFEdgeArrays, start_values: np.ndarray, end_values: np.ndarray) -> None:
+        """Shift the interior centerlines by per-edge eccentricities at their start and end."""
+        rows = np.flatnonzero(arrays.interior & (arrays.next_indices >= 0) & (arrays.prev_indices >= 0))
+        if not len(rows):
+            return
+
+        # The RF directions are the directions of the neighboring mesh edges.
+        lookup, positions = self._vertex_table()
+        next_directions = self._unit_directions(positions, lookup[arrays.next_edges[rows]])
+        prev_directions = self._unit_directions(positions, lookup[arrays.prev_edges[rows]])
+
+        # Setting the start of a compas Line moves its end along, so the per-edge version
+        # of "start += prev * e, end += -prev * e + next * e" moves each end on its own.
+        centerlines = arrays.centerlines[rows]
+        centerlines[:, 0] += prev_directions * start_values[rows, None]
+        centerlines[:, 1] += next_directions * end_values[rows, None]
+        self._write_centerlines(arrays, rows, centerlines)
+
+    def _vertex_table(self) -> tuple:
+        """Return the map from vertex key to row, as an array, and the vertex positions in row order."""
+        vertices = list(self.mesh.vertices())
+        lookup = np.full(max(vertices, default=-1) + 1, -1)
+        lookup[vertices] = np.arange(len(vertices))
+        positions = np.array([self.mesh.vertex_coordinates(vertex) for vertex in vertices], dtype=float).reshape(-1, 3)
+        return lookup, positions
+
+    @staticmethod
+    def _unit_directions(positions: np.ndarray, halfedges: np.ndarray) -> np.ndarray:
+        directions = positions[halfedges[:, 1]] - positions[halfedges[:, 0]]
+        return directions / np.linalg.norm(directions, axis=1)[:, None]
+
+    def _centerline_arrays(self) -> RFEdgeArrays:
+        """Return the columnar store, or a snapshot of the centerlines and neighbors stored on the mesh."""
+        if self.edge_arrays is not None:
+            return self.edge_arrays
+        return RFEdgeArrays.from_mesh_attributes(self.mesh, ("centerline", "next_edge", "prev_edge"))
+
+    def _write_centerlines(self, arrays: RFEdgeArrays, rows: np.ndarray, centerlines: np.ndarray) -> None:
+        arrays.writable("centerlines")[rows] = centerlines
+        if arrays is self.edge_arrays:
+            return
+        # The mesh attributes are updated in place, like the Line objects were before.
+        for row, (start, end) in zip(rows.tolist(), centerlines.tolist()):
+            centerline = self.mesh.edge_attribute(arrays.edges[row], "centerline")
+            centerline.start = start
+            centerline.end = end
+
+    # --------------------------------------------------------------------------
+    # RF SYSTEM ATTRACTORS
+    # --------------------------------------------------------------------------
 
-            centerline: Line = self.mesh.edge_attribute(edge, "centerline")
-            direction = centerline.direction.unitized()
-            if extend_start and extend_end:
-                centerline.start += direction * (-extension)
-                centerline.end += direction * extension * 2
-            elif extend_start and not extend_end:
-                centerline.start += direction * (-extension)
-                centerline.end += direction * extension
-            elif not extend_start and extend_end:
-                centerline.end += direction * extension
+    def attractor_eccentricities(self, field) -> np.ndarray:
+        """
+        Evaluate an attractor field at the start and end vertex of every edge.
 
-            self.mesh.edge_attribute(edge, "centerline", centerline)
+        Parameters
+        ----------
+        field : Attractor | AttractorField
+            The field, see `a02_attractors`.
 
-    # ========================================================================
-    # CHALLENGE 01: Attractors
-    # ========================================================================
+        Returns
+        -------
+        numpy.ndarray
+            The start and end value of every edge in the order of ``mesh.edges()``, shape ``(m, 2)``.
 
-    def eccentrize_centerlines_attractor_point(self, point: Point, factor: float) -> None:
+        """
+        lookup, positions = self._vertex_table()
+        values = field.evaluate(positions)
+        if self.edge_arrays is not None:
+            edges = self.edge_arrays.vertices
+        else:
+            edges = np.array(list(self.mesh.edges()), dtype=int).reshape(-1, 2)
+        return values[lookup[edges]]
+
+    def eccentrize_centerlines_attractor_point(self, point: Point, factor: float, falloff="linear", radius: float = 1.0) -> None:
         """
         Moves the centerlines of the RF system edges towards or away from an attractor point.
         The amount of movement is determined by the distance to the point.
+
+        The point can also be a list of points, then the distance to the nearest one counts.
+        See `PointAttractor` for the falloff and radius, and `AttractorField` to combine attractors.
+        """
+        self.eccentrize_centerlines(self.attractor_eccentricities(PointAttractor(point, factor=factor, falloff=falloff, radius=radius)))
+
+    def eccentrize_centerlines_attractor_curve(self, curve, factor: float, falloff="linear", radius: float = 1.0) -> None:
+        """
+        Eccentrize centerlines base on the distance to an attractor curve.
+
+        The curve can also be a list of curves, then the distance to the nearest one counts.
+        See `CurveAttractor` for the supported curves, the falloff and the radius.
         """
-        # 1. Iterate over all edges in the mesh
-        # 2. Skip boundary edges
-        # 3. Get the next_edge, prev_edge, and centerline attributes for the current edge
-        # 4. Calculate the unitized direction vectors for next_edge and prev_edge
-        # 5. Get the vertex points for the start and end of the current edge
-        # 6. Calculate the distance from each vertex to the attractor point
-        # 7. Multiply the distances by the factor to get the eccentricity values
-        # 8. Calculate the start and end displacements using the direction vectors and eccentricity values
-        # 9. Apply the displacements to the start and end of the centerline
-        # 10. Update the centerline attribute for the current edge
-        pass
-
-    def eccentrize_centerlines_attractor_curve(self, curve, factor: float) -> None:
-        """Eccentrize centerlines base on the distance to an attractor curve."""
-        # 1. Iterate over all edges in the mesh
-        # 2. Skip boundary edges
-        # 3. Get the next_edge, prev_edge, and centerline attributes for the current edge
-        # 4. Calculate the unitized direction vectors for next_edge and prev_edge
-        # 5. Get the vertex points for the start and end of the current edge
-        # 6. Find the closest points on the attractor curve from each vertex
-        # 7. Calculate the distance between each vertex and its closest point on the curve
-        # 8. Multiply the distances by the factor to get the eccentricity values
-        # 9. Calculate the start and end displacements using the direction vectors and eccentricity values
-        # 10. Apply the displacements to the start and end of the centerline
-        # 11. Update the centerline attribute for the current edge
-        pass
+        self.eccentrize_centerlines(self.attractor_eccentricities(CurveAttractor(curve, factor=factor, falloff=falloff, radius=radius)))
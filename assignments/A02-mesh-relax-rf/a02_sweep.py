@@ -0,0 +1,244 @@
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from a02_mesh_relax import MeshRelaxer
+from compas.datastructures import Mesh
+
+# State of a sweep worker process: the shared memory blocks and the arrays in them.
+_worker_state = {}
+
+
+class SharedMeshArrays:
+    """
+    The connectivity, initial vertex positions and vertex attributes of a mesh, packed into shared memory.
+
+    The arrays are written once by the process that runs the sweep. Worker processes attach
+    to the same memory blocks by name instead of receiving a pickled copy of the mesh with
+    every configuration.
+
+    Every vertex attribute other than the coordinates is packed as well, e.g. the ``fixed``
+    flags or the ``u`` and ``v`` grid indices of `QuadMesher`, so modifiers and goals that
+    read them see the same values as in the process that runs the sweep. Attributes whose
+    values are all booleans or numbers get an array each, all others (e.g. vectors, or
+    attributes not set on every vertex) are pickled together into one block.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh to share.
+
+    Attributes
+    ----------
+    spec : dict
+        Map from array name to ``(block name, shape, dtype)``, enough to attach to the arrays.
+
+    """
+
+    # Prefix of the names of the attribute arrays.
+    ATTRIBUTE = "attribute:"
+
+    def __init__(self, mesh: Mesh):
+        vertices = list(mesh.vertices())
+        faces = [mesh.face_vertices(face) for face in mesh.faces()]
+        arrays = {
+            "positions": np.array([mesh.vertex_coordinates(vertex) for vertex in vertices], dtype=float).reshape(-1, 3),
+            "vertex_keys": np.array(vertices, dtype=np.int64),
+            "face_vertices": np.array([vertex for face in faces for vertex in face], dtype=np.int64),
+            "face_offsets": np.concatenate(([0], np.cumsum([len(face) for face in faces], dtype=np.int64))),
+        }
+
+        objects = {}
+        names = {name for vertex in vertices for name in mesh.vertex_attributes(vertex)} - {"x", "y", "z"}
+        for name in sorted(names):
+            values = [mesh.vertex_attribute(vertex, name) for vertex in vertices]
+            types = {type(value) for value in values}
+            if types <= {bool}:
+                arrays[self.ATTRIBUTE + name] = np.array(values, dtype=bool)
+            elif types <= {bool, int}:
+                arrays[self.ATTRIBUTE + name] = np.array(values, dtype=np.int64)
+            elif types <= {bool, int, float}:
+                arrays[self.ATTRIBUTE + name] = np.array(values, dtype=float)
+            elif types != {type(None)}:
+                objects[name] = values
+        if objects:
+            arrays["objects"] = np.frombuffer(pickle.dumps(objects), dtype=np.uint8)
+
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    @staticmethod
+    def attach(spec: dict) -> tuple:
+        """Attach to the shared arrays described by ``spec``, return the blocks and the (read-only) arrays."""
+        blocks = []
+        arrays = {}
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array.flags.writeable = False
+            blocks.append(block)
+            arrays[name] = array
+        return blocks, arrays
+
+    @classmethod
+    def to_mesh(cls, arrays: dict) -> Mesh:
+        """Rebuild the mesh from the shared arrays, with the original vertex keys and attributes."""
+        columns = {name[len(cls.ATTRIBUTE) :]: array.tolist() for name, array in arrays.items() if name.startswith(cls.ATTRIBUTE)}
+        if "objects" in arrays:
+            objects = pickle.loads(arrays["objects"].tobytes())
+            columns.update({name: values for name, values in objects.items()})
+
+        mesh = Mesh()
+        for row, (vertex, (x, y, z)) in enumerate(zip(arrays["vertex_keys"].tolist(), arrays["positions"].tolist())):
+            attributes = {name: values[row] for name, values in columns.items() if values[row] is not None}
+            mesh.add_vertex(key=vertex, x=x, y=y, z=z, attr_dict=attributes)
+
+        face_vertices = arrays["face_vertices"].tolist()
+        offsets = arrays["face_offsets"].tolist()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            mesh.add_face(face_vertices[start:end])
+        return mesh
+
+    def close(self) -> None:
+        """Release the shared memory blocks."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+class SweepResult:
+    """
+    Compact result of one configuration of a `RelaxationSweep`.
+
+    Attributes
+    ----------
+    index : int
+        The position of the configuration in the sweep.
+    positions : numpy.ndarray
+        The relaxed vertex coordinates, shape ``(n, 3)``, in the vertex order of the mesh.
+    residual : float
+        The residual of the last step, if the relaxer tracked convergence.
+    steps : int
+        The number of steps performed.
+    converged : bool
+        Whether the relaxation stopped because the tolerances were met.
+    elapsed : float
+        The time the relaxation took, in seconds.
+
+    """
+
+    def __init__(self, index: int, positions: np.ndarray, residual: float, steps: int, converged: bool, elapsed: float):
+        self.index = index
+        self.positions = positions
+        self.residual = residual
+        self.steps = steps
+        self.converged = converged
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f"SweepResult(index={self.index}, steps={self.steps}, residual={self.residual}, elapsed={self.elapsed:.3f})"
+
+
+def _initialize_worker(spec: dict) -> None:
+    blocks, arrays = SharedMeshArrays.attach(spec)
+    _worker_state["blocks"] = blocks
+    _worker_state["arrays"] = arrays
+
+
+def _relax_configuration(index: int, configuration: dict) -> SweepResult:
+    arrays = _worker_state["arrays"]
+
+    # Every configuration starts from a new mesh with the shared initial positions and attributes,
+    # so nothing a configuration changes, e.g. the connectivity or the forces, reaches the next one.
+    mesh = SharedMeshArrays.to_mesh(arrays)
+    fixed = [vertex for vertex in mesh.vertices() if mesh.vertex_attribute(vertex, "fixed")]
+
+    start = time.perf_counter()
+    relaxer = MeshRelaxer(mesh, **configuration)
+    for vertex in fixed:
+        mesh.vertex_attribute(vertex, "fixed", True)
+    relaxer.relax()
+    elapsed = time.perf_counter() - start
+
+    positions = np.array([mesh.vertex_coordinates(vertex) for vertex in arrays["vertex_keys"].tolist()], dtype=float).reshape(-1, 3)
+    return SweepResult(index, positions, relaxer.residual, relaxer.steps, relaxer.converged, elapsed)
+
+
+class RelaxationSweep:
+    """
+    Run many `MeshRelaxer` configurations on the same mesh in a pool of worker processes.
+
+    The connectivity, initial positions and vertex attributes of the mesh are put into shared
+    memory once (see `SharedMeshArrays`); every worker relaxes one configuration after the
+    other, each on a new mesh rebuilt from them. Only the configurations are sent to the workers
+    and only compact `SweepResult` objects come back. Every configuration is relaxed from the
+    same state with its own copy of the goals and modifiers, so the results do not depend on the
+    number of workers or on the order in which they finish.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh to relax. It is not modified.
+    configurations : list[dict]
+        Keyword arguments for `MeshRelaxer`, one dict per run, e.g.
+        ``{"damping": 0.1, "iterations": 200, "modifiers": [...], "goals": goals}``.
+        Goals and modifiers must be picklable.
+    workers : int, optional
+        The number of worker processes. Defaults to the number of CPUs.
+        With ``workers=1`` the sweep runs in the current process, e.g. inside Rhino.
+
+    """
+
+    def __init__(self, mesh: Mesh, configurations: list[dict], workers: int = None):
+        self.mesh = mesh
+        self.configurations = list(configurations)
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self):
+        """
+        Relax all configurations and yield their results as they finish.
+
+        Yields
+        ------
+        SweepResult
+            The result of one configuration. The ``index`` attribute tells which one.
+
+        """
+        shared = SharedMeshArrays(self.mesh)
+        try:
+            if self.workers == 1:
+                _initialize_worker(shared.spec)
+                try:
+                    for index, configuration in enumerate(self.configurations):
+                        # Same isolation as in a worker process: the goals and modifiers are copies.
+                        yield _relax_configuration(index, pickle.loads(pickle.dumps(configuration)))
+                finally:
+                    self._release_worker_state()
+                return
+
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_initialize_worker, initargs=(shared.spec,)) as executor:
+                futures = [executor.submit(_relax_configuration, index, configuration) for index, configuration in enumerate(self.configurations)]
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            shared.close()
+
+    def results(self) -> list[SweepResult]:
+        """Relax all configurations and return the results in the order of the configurations."""
+        return sorted(self.run(), key=lambda result: result.index)
+
+    @staticmethod
+    def _release_worker_state() -> None:
+        _worker_state.pop("arrays", None)
+        for block in _worker_state.pop("blocks", []):
+            block.close()
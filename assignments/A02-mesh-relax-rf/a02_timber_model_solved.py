@@ -70,15 +70,15 @@ class TimberModelCreator:
         mesh: Mesh = self.rf_system.mesh
 
         for edge in mesh.edges():
-            centerline = mesh.edge_attribute(edge, "centerline")
-            normal = mesh.edge_attribute(edge, "normal")
+            centerline = self.rf_system.edge_attribute(edge, "centerline")
+            normal = self.rf_system.edge_attribute(edge, "normal")
 
             beam = Beam.from_centerline(centerline, width=self.beam_width, height=self.beam_height, z_vector=normal)
             beam.attributes["category"] = self._edge_category(edge)
             self.timber_model.add_element(beam)
 
             # Keep track of edge-to-beam relationship
-            mesh.edge_attribute(edge, "beam", beam)
+            self.rf_system.edge_attribute(edge, "beam", beam)
 
     def _edge_category(self, edge) -> str:
         if self.rf_system.mesh.is_edge_on_boundary(edge):
@@ -150,12 +150,12 @@ class TimberModelCreator:
             if mesh.is_edge_on_boundary(edge):
                 continue
 
-            beam = mesh.edge_attribute(edge, "beam")
-            next_edge = mesh.edge_attribute(edge, "next_edge")
-            prev_edge = mesh.edge_attribute(edge, "prev_edge")
+            beam = self.rf_system.edge_attribute(edge, "beam")
+            next_edge = self.rf_system.edge_attribute(edge, "next_edge")
+            prev_edge = self.rf_system.edge_attribute(edge, "prev_edge")
 
-            next_beam = mesh.edge_attribute(next_edge, "beam") if next_edge else None
-            prev_beam = mesh.edge_attribute(prev_edge, "beam") if prev_edge else None
+            next_beam = self.rf_system.edge_attribute(next_edge, "beam") if next_edge else None
+            prev_beam = self.rf_system.edge_attribute(prev_edge, "beam") if prev_edge else None
 
             if beam is None:
                 continue
@@ -194,7 +194,7 @@ class TimberModelCreator:
             if len(boundary_edges) != 2:
                 continue
 
-            beam_a = mesh.edge_attribute(boundary_edges[0], "beam")
-            beam_b = mesh.edge_attribute(boundary_edges[1], "beam")
+            beam_a = self.rf_system.edge_attribute(boundary_edges[0], "beam")
+            beam_b = self.rf_system.edge_attribute(boundary_edges[1], "beam")
             if beam_a and beam_b:
                 self._rules.append(DirectRule(LMiterJoint, [beam_a, beam_b], self.tolerance))
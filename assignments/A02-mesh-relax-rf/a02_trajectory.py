@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+from compas.datastructures import Mesh
+
+
+class TrajectoryRecorder:
+    """
+    Compact recording of the vertex positions (and optionally forces) of a relaxation.
+
+    Instead of copying the whole mesh for every step, the recorder stores one ``(n, 3)``
+    frame per recorded step in a single array: either in memory, preallocated for the
+    expected number of frames, or appended to a raw binary file on disk that is read back
+    as a memory map. Any recorded frame can then be written back into one existing mesh
+    with :meth:`apply`, e.g. from a slider in Grasshopper, without rebuilding meshes.
+
+    Parameters
+    ----------
+    stride : int, optional
+        Record every ``stride``-th step. The state before the first step is always recorded.
+    forces : bool, optional
+        Whether to record the vertex forces as well.
+    path : str, optional
+        Append the frames to this file instead of keeping them in memory. The forces
+        go to ``path + ".forces"``. Existing files are overwritten.
+    dtype : numpy.dtype, optional
+        The type of the stored coordinates. Single precision halves the size of the recording.
+
+    Attributes
+    ----------
+    vertex_keys : numpy.ndarray
+        The vertex keys, in the row order of the frames.
+    steps : list[int]
+        The step number of every recorded frame.
+
+    """
+
+    def __init__(self, stride: int = 1, forces: bool = False, path: str = None, dtype=np.float32):
+        if stride < 1:
+            raise ValueError("The stride of a TrajectoryRecorder must be at least 1.")
+
+        self.stride = stride
+        self.record_forces = forces
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all recorded frames."""
+        self.vertex_keys = None
+        self.steps = []
+        self._positions = None
+        self._forces = None
+        self._maps = None
+        if self.path:
+            for path in (self.path, self.path + ".forces"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the recorded frames in bytes."""
+        frame_size = len(self.vertex_keys) * 3 * self.dtype.itemsize if self.vertex_keys is not None else 0
+        return len(self) * frame_size * (2 if self.record_forces else 1)
+
+    def start(self, vertex_keys, frames: int) -> None:
+        """
+        Prepare the recording of a relaxation.
+
+        Parameters
+        ----------
+        vertex_keys : numpy.ndarray
+            The vertex keys, in the row order of the frames that will be recorded.
+        frames : int
+            The number of frames expected, used to preallocate the in-memory recording.
+
+        """
+        vertex_keys = np.asarray(vertex_keys, dtype=int)
+        if self.vertex_keys is not None and not np.array_equal(vertex_keys, self.vertex_keys):
+            raise ValueError("The mesh differs from the recorded one, call clear() before recording it.")
+        self.vertex_keys = vertex_keys
+
+        if not self.path:
+            self._positions = self._reserve(self._positions, frames)
+            if self.record_forces:
+                self._forces = self._reserve(self._forces, frames)
+
+    def should_record(self, step: int) -> bool:
+        """Return True if the given step is recorded."""
+        return step % self.stride == 0
+
+    def record(self, step: int, positions: np.ndarray, forces: np.ndarray = None) -> None:
+        """Store one frame."""
+        index = len(self.steps)
+        if self.path:
+            self._append(self.path, positions)
+            if self.record_forces:
+                self._append(self.path + ".forces", forces)
+            self._maps = None
+        else:
+            self._positions = self._reserve(self._positions, index + 1)
+            self._positions[index] = positions
+            if self.record_forces:
+                self._forces = self._reserve(self._forces, index + 1)
+                self._forces[index] = forces
+        self.steps.append(step)
+
+    def positions(self, index: int = None) -> np.ndarray:
+        """Return the positions of one frame, shape ``(n, 3)``, or of all frames, shape ``(frames, n, 3)``."""
+        frames = self._frames()[0]
+        return frames if index is None else frames[index]
+
+    def forces(self, index: int = None) -> np.ndarray:
+        """Return the forces of one frame, shape ``(n, 3)``, or of all frames, shape ``(frames, n, 3)``."""
+        if not self.record_forces:
+            raise ValueError("This recorder does not record forces.")
+        frames = self._frames()[1]
+        return frames if index is None else frames[index]
+
+    def frame_at_step(self, step: int) -> int:
+        """Return the index of the last frame recorded at or before the given step."""
+        return max(int(np.searchsorted(self.steps, step, side="right")) - 1, 0)
+
+    def apply(self, mesh: Mesh, index: int) -> Mesh:
+        """Move the vertices of the mesh to the positions of one frame and return it."""
+        for vertex, xyz in zip(self.vertex_keys.tolist(), self.positions(index).tolist()):
+            mesh.vertex_attributes(vertex, "xyz", xyz)
+        return mesh
+
+    def _reserve(self, frames: np.ndarray, count: int) -> np.ndarray:
+        shape = (count, len(self.vertex_keys), 3)
+        if frames is None:
+            return np.empty(shape, dtype=self.dtype)
+        if len(frames) >= count:
+            return frames
+        # Grow geometrically, so that recording past the expected number of frames stays cheap.
+        grown = np.empty((max(count, 2 * len(frames)),) + shape[1:], dtype=self.dtype)
+        grown[: len(self.steps)] = frames[: len(self.steps)]
+        return grown
+
+    def _append(self, path: str, frame: np.ndarray) -> None:
+        with open(path, "ab") as stream:
+            stream.write(np.ascontiguousarray(frame, dtype=self.dtype).tobytes())
+
+    def _frames(self) -> tuple:
+        count = len(self.steps)
+        if not count:
+            return np.zeros((0, 0, 3), dtype=self.dtype), np.zeros((0, 0, 3), dtype=self.dtype)
+        if not self.path:
+            forces = self._forces[:count] if self.record_forces else None
+            return self._positions[:count], forces
+
+        if self._maps is None:
+            shape = (count, len(self.vertex_keys), 3)
+            positions = np.memmap(self.path, dtype=self.dtype, mode="r", shape=shape)
+            forces = np.memmap(self.path + ".forces", dtype=self.dtype, mode="r", shape=shape) if self.record_forces else None
+            self._maps = (positions, forces)
+        return self._maps
@@ -0,0 +1,109 @@
+import numpy as np
+from compas.geometry import NurbsSurface
+
+# Same numbering as Rhino.Geometry.PointFaceRelation.
+EXTERIOR = 0
+INTERIOR = 1
+BOUNDARY = 2
+
+
+class TrimmedFace:
+    """
+    A surface trimmed by polygons in its UV space.
+
+    This is the part of a Rhino ``BrepFace`` the meshers need: the underlying surface and
+    its trim loops, approximated by polygons. Many UV points are classified at once against
+    all loops, and it works without Rhino, e.g. to mesh a `NurbsSurface` with a hole outside
+    of Rhino.
+
+    Parameters
+    ----------
+    surface : NurbsSurface
+        The underlying surface.
+    loops : list[list[tuple[float, float]]]
+        The trim loops as UV polygons. The first loop is the outer boundary, the others are holes.
+    tolerance : float, optional
+        UV points closer than this to a loop are on the boundary of the face. For loops that
+        approximate curves, use at least the deviation of the polygons from the curves.
+
+    """
+
+    def __init__(self, surface: NurbsSurface, loops: list, tolerance: float = 1e-8):
+        if not loops:
+            raise ValueError("A TrimmedFace needs at least the outer loop.")
+
+        self.surface = surface
+        self.tolerance = tolerance
+        self.loops = [self._polygon(loop) for loop in loops]
+
+        # All segments of all loops, and where the segments of every loop start.
+        self._starts = np.concatenate(([0], np.cumsum([len(loop) for loop in self.loops])[:-1]))
+        self._a = np.concatenate(self.loops)
+        self._b = np.concatenate([np.roll(loop, -1, axis=0) for loop in self.loops])
+
+    @classmethod
+    def from_surface(cls, surface: NurbsSurface, tolerance: float = 1e-8) -> "TrimmedFace":
+        """Return the untrimmed face of the surface, with its domain as the outer loop."""
+        (u0, u1), (v0, v1) = surface.domain_u, surface.domain_v
+        return cls(surface, [[(u0, v0), (u1, v0), (u1, v1), (u0, v1)]], tolerance=tolerance)
+
+    @staticmethod
+    def _polygon(loop) -> np.ndarray:
+        polygon = np.asarray(loop, dtype=float).reshape(-1, 2)
+        if len(polygon) > 1 and np.array_equal(polygon[0], polygon[-1]):
+            polygon = polygon[:-1]
+        if len(polygon) < 3:
+            raise ValueError("A trim loop needs at least three points.")
+        return polygon
+
+    def relations(self, u, v, chunk_size: int = 2**20) -> np.ndarray:
+        """
+        Classify UV points as outside, inside or on the boundary of the face.
+
+        Parameters
+        ----------
+        u : numpy.ndarray
+            The U parameters.
+        v : numpy.ndarray
+            The V parameters.
+        chunk_size : int, optional
+            The number of point-segment pairs tested at once, to bound the memory use.
+
+        Returns
+        -------
+        numpy.ndarray
+            `EXTERIOR`, `INTERIOR` or `BOUNDARY` for every point, like Rhino's ``IsPointOnFace``.
+
+        """
+        points = np.column_stack((np.ravel(u), np.ravel(v))).astype(float)
+        relations = np.empty(len(points), dtype=int)
+        step = max(chunk_size // len(self._a), 1)
+        for start in range(0, len(points), step):
+            relations[start : start + step] = self._relations(points[start : start + step])
+        return relations.reshape(np.shape(u))
+
+    def contains(self, u, v) -> np.ndarray:
+        """Return True for the UV points inside or on the boundary of the face."""
+        return self.relations(u, v) != EXTERIOR
+
+    def _relations(self, points: np.ndarray) -> np.ndarray:
+        a, b = self._a, self._b
+        p = points[:, None, :]
+
+        # Distance of every point to every segment.
+        ab = b - a
+        length_squared = np.maximum(np.einsum("ij,ij->i", ab, ab), 1e-300)
+        t = np.clip(np.einsum("nij,ij->ni", p - a, ab) / length_squared, 0.0, 1.0)
+        distances = np.linalg.norm(p - (a + t[:, :, None] * ab), axis=2)
+        on_boundary = (distances < self.tolerance).any(axis=1)
+
+        # Even-odd rule per loop: count the segments a ray in +U direction crosses.
+        x, y = points[:, 0:1], points[:, 1:2]
+        straddles = (a[:, 1] > y) != (b[:, 1] > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing_x = (b[:, 0] - a[:, 0]) * (y - a[:, 1]) / (b[:, 1] - a[:, 1]) + a[:, 0]
+        crossings = straddles & (x < crossing_x)
+        inside_loops = np.add.reduceat(crossings.astype(int), self._starts, axis=1) % 2 == 1
+        inside = inside_loops[:, 0] & ~inside_loops[:, 1:].any(axis=1)
+
+        return np.where(on_boundary, BOUNDARY, np.where(inside, INTERIOR, EXTERIOR))
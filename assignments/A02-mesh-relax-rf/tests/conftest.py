@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from compas.datastructures import Mesh
+
+# The assignment modules are imported by name, like from the Grasshopper definition.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_grid(n: int = 10, seed: int = 0, noise: float = 0.2, size: float = 10.0) -> Mesh:
+    """Return an ``n`` by ``n`` quad grid with randomly displaced interior vertices and ``u``/``v`` grid indices."""
+    rng = np.random.default_rng(seed)
+    mesh = Mesh()
+    keys = {}
+    for i in range(n + 1):
+        for j in range(n + 1):
+            x, y, z = size * i / n, size * j / n, 0.0
+            if 0 < i < n and 0 < j < n:
+                x, y, z = np.array([x, y, z]) + rng.normal(size=3) * noise
+            keys[i, j] = mesh.add_vertex(x=float(x), y=float(y), z=float(z), u=i, v=j)
+    for i in range(n):
+        for j in range(n):
+            mesh.add_face([keys[i, j], keys[i + 1, j], keys[i + 1, j + 1], keys[i, j + 1]])
+    return mesh
+
+
+def make_surface(count: int = 6, degree: int = 3, seed: int = 3, amplitude: float = 1.5) -> SimpleNamespace:
+    """
+    Return a bumpy rational surface over ``[0, 10]²`` with a non-uniform knot vector.
+
+    It has the attributes `NurbsSurfaceEvaluator.from_surface` reads from a COMPAS `NurbsSurface`,
+    which cannot be created without a geometry plugin, and Rhino-style knot vectors.
+    """
+    rng = np.random.default_rng(seed)
+    coordinates = np.linspace(0.0, 10.0, count)
+    points = np.zeros((count, count, 3))
+    points[:, :, 0] = coordinates[:, None]
+    points[:, :, 1] = coordinates[None, :]
+    points[:, :, 2] = rng.normal(size=(count, count)) * amplitude
+    interior = np.sort(rng.uniform(0.1, 0.9, count - degree - 1))
+    knots = [0.0] * degree + interior.tolist() + [1.0] * degree
+    return SimpleNamespace(
+        points=points.tolist(),
+        weights=rng.uniform(0.7, 1.3, (count, count)).tolist(),
+        knotvector_u=knots,
+        knotvector_v=knots,
+        degree_u=degree,
+        degree_v=degree,
+    )
+
+
+@pytest.fixture
+def grid():
+    return make_grid
+
+
+@pytest.fixture
+def surface():
+    return make_surface()
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from compas.geometry import Point
+from compas.geometry import Polyline
+from compas.geometry import Vector
+
+# The module converts Rhino curves in MeshRelaxerGoals.from_brep, so it needs compas_rhino and Rhino.
+a02_mesh_relax = pytest.importorskip("a02_mesh_relax")
+a02_modifiers = pytest.importorskip("a02_modifiers")
+
+
+def boundary_goals(size: float = 10.0):
+    corners = [Point(0, 0, 0), Point(size, 0, 0), Point(size, size, 0), Point(0, size, 0)]
+    return a02_mesh_relax.MeshRelaxerGoals(target_boundary=Polyline(corners + corners[:1]), target_corners=corners)
+
+
+def positions(mesh) -> np.ndarray:
+    return np.array([mesh.vertex_coordinates(vertex) for vertex in mesh.vertices()])
+
+
+def relax(mesh, fixed=(), **options):
+    relaxer = a02_mesh_relax.MeshRelaxer(mesh, **options)
+    # The relaxer resets the fixed attribute of all vertices.
+    for vertex in fixed:
+        mesh.vertex_attribute(vertex, "fixed", True)
+    relaxer.relax()
+    return relaxer
+
+
+@pytest.mark.parametrize("holed", [False, True])
+def test_numpy_engine_matches_mesh_engine(grid, holed):
+    def setup():
+        mesh = grid(8, seed=4)
+        if holed:
+            for face in [10, 11, 27]:
+                mesh.delete_face(face)
+        return mesh
+
+    # The boundary goal would pull the edges of the holes onto the outer boundary, so the outer boundary is fixed instead.
+    initial = setup()
+    fixed = [vertex for vertex in initial.vertices() if holed and {0, 8} & set(initial.vertex_attributes(vertex, ["u", "v"]))]
+
+    options = dict(
+        iterations=30,
+        damping=0.2,
+        goals=None if holed else boundary_goals(),
+        modifiers=[a02_modifiers.DirectionalForceModifier(Vector(0, 0, -1), 0.01)],
+    )
+    mesh = setup()
+    relax(mesh, fixed, engine="mesh", **options)
+    array_mesh = setup()
+    relax(array_mesh, fixed, engine="numpy", **options)
+
+    assert np.allclose(positions(array_mesh), positions(mesh), atol=1e-9)
+    assert not np.allclose(positions(mesh), positions(initial))
+
+
+def test_engines_stop_after_the_same_steps(grid):
+    options = dict(iterations=5000, damping=0.2, goals=boundary_goals(), force_tolerance=1e-4)
+    results = {}
+    for engine in ("mesh", "numpy"):
+        mesh = grid(6, seed=5)
+        relaxer = relax(mesh, engine=engine, **options)
+        results[engine] = relaxer.steps, relaxer.converged, positions(mesh)
+
+    assert results["mesh"][:2] == results["numpy"][:2]
+    assert results["numpy"][1]
+    assert np.allclose(results["numpy"][2], results["mesh"][2], atol=1e-9)
+
+
+def test_multilevel_relaxer_keeps_the_fixed_vertices(grid):
+    mesh = grid(16, seed=6)
+    fixed = [vertex for vertex in mesh.vertices() if mesh.vertex_attributes(vertex, ["u", "v"]) in ([5, 7], [8, 8])]
+    for vertex in fixed:
+        mesh.vertex_attribute(vertex, "fixed", True)
+    before = {vertex: mesh.vertex_coordinates(vertex) for vertex in fixed}
+
+    multilevel = a02_mesh_relax.MultilevelRelaxer(mesh, levels=3, iterations=20000, goals=boundary_goals(), engine="numpy", damping=0.2, force_tolerance=1e-6)
+    multilevel.relax()
+
+    assert all(relaxer.converged for relaxer in multilevel.relaxers)
+    assert all(mesh.vertex_attribute(vertex, "fixed") for vertex in fixed)
+    assert all(np.allclose(mesh.vertex_coordinates(vertex), xyz) for vertex, xyz in before.items())
+    for coarse in multilevel.meshes[1:]:
+        assert all(coarse.has_vertex(vertex) for vertex in fixed)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from a02_nurbs import NurbsSurfaceEvaluator
+from scipy.interpolate import BSpline
+
+
+def reference_points(surface, u, v) -> np.ndarray:
+    """Evaluate the rational surface directly from its definition with the B-splines of SciPy."""
+    evaluator = NurbsSurfaceEvaluator.from_surface(surface)
+    basis_u = BSpline.design_matrix(u, evaluator.knots_u, evaluator.degree_u).toarray()
+    basis_v = BSpline.design_matrix(v, evaluator.knots_v, evaluator.degree_v).toarray()
+    weights = np.array(surface.weights)
+    points = np.array(surface.points)
+    numerator = np.einsum("mi,mj,ij,ijk->mk", basis_u, basis_v, weights, points)
+    denominator = np.einsum("mi,mj,ij->m", basis_u, basis_v, weights)
+    return numerator / denominator[:, None]
+
+
+@pytest.fixture
+def parameters():
+    rng = np.random.default_rng(7)
+    # Include the domain corners, where the spans are clamped.
+    u = np.concatenate(([0.0, 1.0, 0.0, 1.0], rng.uniform(0.0, 1.0, 200)))
+    v = np.concatenate(([0.0, 0.0, 1.0, 1.0], rng.uniform(0.0, 1.0, 200)))
+    return u, v
+
+
+def test_points_match_reference(surface, parameters):
+    u, v = parameters
+    evaluator = NurbsSurfaceEvaluator.from_surface(surface)
+    assert np.allclose(evaluator.points_at(u, v), reference_points(surface, u, v), atol=1e-12)
+
+
+def test_grid_matches_points(surface):
+    evaluator = NurbsSurfaceEvaluator.from_surface(surface)
+    u_values = np.linspace(0.0, 1.0, 13)
+    v_values = np.linspace(0.0, 1.0, 7)
+    grid = evaluator.grid(u_values, v_values)
+    uu, vv = np.meshgrid(u_values, v_values, indexing="ij")
+    assert grid.shape == (13, 7, 3)
+    assert np.allclose(grid.reshape(-1, 3), evaluator.points_at(uu.ravel(), vv.ravel()), atol=1e-12)
+
+
+def test_derivatives_match_finite_differences(surface):
+    evaluator = NurbsSurfaceEvaluator.from_surface(surface)
+    rng = np.random.default_rng(11)
+    u, v = rng.uniform(0.05, 0.95, (2, 50))
+    h = 1e-5
+
+    S, Su, Sv, Suu, Suv, Svv = evaluator.evaluate(u, v, derivatives=2)
+
+    def points(du, dv):
+        return evaluator.points_at(u + du, v + dv)
+
+    assert np.allclose(S, reference_points(surface, u, v), atol=1e-12)
+    assert np.allclose(Su, (points(h, 0) - points(-h, 0)) / (2 * h), atol=1e-5)
+    assert np.allclose(Sv, (points(0, h) - points(0, -h)) / (2 * h), atol=1e-5)
+
+    # Second derivatives by differences of the exact first derivatives.
+    _, Su_plus, Sv_plus = evaluator.evaluate(u + h, v, derivatives=1)
+    _, Su_minus, Sv_minus = evaluator.evaluate(u - h, v, derivatives=1)
+    _, _, Sv_up = evaluator.evaluate(u, v + h, derivatives=1)
+    _, _, Sv_down = evaluator.evaluate(u, v - h, derivatives=1)
+    assert np.allclose(Suu, (Su_plus - Su_minus) / (2 * h), atol=1e-4)
+    assert np.allclose(Suv, (Sv_plus - Sv_minus) / (2 * h), atol=1e-4)
+    assert np.allclose(Svv, (Sv_up - Sv_down) / (2 * h), atol=1e-4)
+
+
+def test_rhino_and_full_knot_vectors_are_equivalent(surface):
+    evaluator = NurbsSurfaceEvaluator.from_surface(surface)
+    full = NurbsSurfaceEvaluator(surface.points, surface.weights, evaluator.knots_u, evaluator.knots_v, surface.degree_u, surface.degree_v)
+    u = np.linspace(0.0, 1.0, 9)
+    assert np.array_equal(full.points_at(u, u[::-1]), evaluator.points_at(u, u[::-1]))
+
+
+def test_wrong_knot_count_raises(surface):
+    with pytest.raises(ValueError):
+        NurbsSurfaceEvaluator(surface.points, surface.weights, surface.knotvector_u[1:], surface.knotvector_v, surface.degree_u, surface.degree_v)
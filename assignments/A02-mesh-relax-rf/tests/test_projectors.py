@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from a02_nurbs import NurbsSurfaceEvaluator
+from a02_projectors import BoundaryProjector
+from a02_projectors import SurfaceProjector
+from compas.geometry import Point
+from compas.geometry import Polyline
+from scipy.optimize import minimize
+
+
+def brute_force_surface_projection(evaluator: NurbsSurfaceEvaluator, points: np.ndarray, samples: int = 300) -> np.ndarray:
+    """Return the closest surface points by a dense sampling, refined by a bounded minimization."""
+    values = np.linspace(0.0, 1.0, samples)
+    grid = evaluator.grid(values, values).reshape(-1, 3)
+    closest = []
+    for point in points:
+        nearest = np.argmin(np.einsum("ij,ij->i", grid - point, grid - point))
+        start = values[nearest // samples], values[nearest % samples]
+        result = minimize(
+            lambda uv: np.sum((evaluator.points_at(uv[:1], uv[1:])[0] - point) ** 2),
+            start,
+            bounds=[(0.0, 1.0), (0.0, 1.0)],
+            method="L-BFGS-B",
+            options={"ftol": 1e-15, "gtol": 1e-12},
+        )
+        closest.append(evaluator.points_at(result.x[:1], result.x[1:])[0])
+    return np.array(closest)
+
+
+def brute_force_polyline_projection(points: np.ndarray, polyline: np.ndarray) -> np.ndarray:
+    """Return the closest points on the polyline by testing every segment."""
+    starts, vectors = polyline[:-1], polyline[1:] - polyline[:-1]
+    t = np.einsum("mij,ij->mi", points[:, None] - starts, vectors) / np.einsum("ij,ij->i", vectors, vectors)
+    candidates = starts + np.clip(t, 0.0, 1.0)[:, :, None] * vectors
+    distances = np.linalg.norm(candidates - points[:, None], axis=2)
+    return candidates[np.arange(len(points)), distances.argmin(axis=1)]
+
+
+@pytest.fixture
+def surface_points(surface):
+    rng = np.random.default_rng(5)
+    xy = rng.uniform(-1.0, 11.0, (40, 2))
+    return np.column_stack((xy, rng.uniform(-3.0, 3.0, 40)))
+
+
+def distances(points: np.ndarray, projected: np.ndarray) -> np.ndarray:
+    return np.linalg.norm(projected - points, axis=1)
+
+
+def test_surface_projection_matches_brute_force(surface, surface_points):
+    projector = SurfaceProjector(surface)
+    projected = projector.project(surface_points)
+    reference = brute_force_surface_projection(projector.evaluator, surface_points)
+    _, sample_distances = projector.initial_parameters(surface_points)
+
+    assert np.all(distances(surface_points, projected) <= sample_distances + projector.tolerance)
+    assert np.allclose(distances(surface_points, projected), distances(surface_points, reference), atol=1e-4)
+    assert np.allclose(projected, reference, atol=1e-2)
+
+
+def test_warm_started_surface_projection_matches_brute_force_after_small_moves(surface, surface_points):
+    projector = SurfaceProjector(surface)
+    keys = np.arange(len(surface_points))
+    projector.project(surface_points, keys)
+
+    moved = surface_points + np.random.default_rng(9).normal(size=surface_points.shape) * 0.05
+    projected = projector.project(moved, keys)
+    reference = brute_force_surface_projection(projector.evaluator, moved)
+
+    assert np.allclose(distances(moved, projected), distances(moved, reference), atol=1e-6)
+
+
+def test_warm_started_surface_projection_is_never_worse_than_the_samples(surface, surface_points):
+    projector = SurfaceProjector(surface)
+    keys = np.arange(len(surface_points))
+    projector.project(surface_points, keys)
+
+    # Large moves can leave the remembered parameters in the basin of another local minimum.
+    moved = surface_points + np.random.default_rng(9).normal(size=surface_points.shape) * 2.0
+    projected = projector.project(moved, keys)
+    _, sample_distances = projector.initial_parameters(moved)
+
+    assert np.all(distances(moved, projected) <= sample_distances + projector.tolerance)
+
+
+@pytest.mark.parametrize("segments", [4, 300])
+def test_polyline_projection_matches_brute_force(segments):
+    rng = np.random.default_rng(segments)
+    polyline = np.cumsum(rng.normal(size=(segments + 1, 3)), axis=0)
+    # Points close to the polyline and far from it.
+    points = np.concatenate((polyline[rng.integers(0, segments, 200)] + rng.normal(size=(200, 3)) * 0.3, rng.normal(size=(50, 3)) * 50.0))
+
+    projected = BoundaryProjector(Polyline(polyline.tolist())).project(points)
+    reference = brute_force_polyline_projection(points, polyline)
+
+    assert np.allclose(distances(points, projected), distances(points, reference), atol=1e-12)
+
+
+def test_corner_points_snap_to_the_nearest_corner():
+    boundary = Polyline([[0, 0, 0], [10, 0, 0], [10, 10, 0], [0, 10, 0], [0, 0, 0]])
+    corners = [Point(0, 0, 0), Point(10, 0, 0), Point(10, 10, 0), Point(0, 10, 0)]
+    points = np.array([[0.5, -0.2, 1.0], [9.0, 9.5, 0.0], [5.0, 0.3, 0.0]])
+
+    projected = BoundaryProjector(boundary, corners).project(points, corner_mask=np.array([True, True, False]))
+
+    assert np.allclose(projected, [[0, 0, 0], [10, 10, 0], [5, 0, 0]])
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from a02_relax_engine import MeshTopology
+from a02_relax_engine import RelaxEngine
+
+
+def reference_forces(mesh, damping: float) -> dict:
+    """The spring forces computed vertex by vertex through the mesh API, like the ``mesh`` engine of `MeshRelaxer`."""
+    forces = {}
+    for vertex in mesh.vertices():
+        neighbors = mesh.vertex_neighbors(vertex)
+        force = np.zeros(3)
+        if len(neighbors) != 2:
+            for neighbor in neighbors:
+                force += np.array(mesh.edge_vector((vertex, neighbor))) * mesh.edge_length((vertex, neighbor)) * damping / len(neighbors)
+        forces[vertex] = force
+    return forces
+
+
+@pytest.fixture
+def holed_mesh(grid):
+    # Deleted faces leave gaps in the vertex and face keys and vertices without faces.
+    mesh = grid(8, seed=1)
+    for face in [10, 11, 27]:
+        mesh.delete_face(face)
+    mesh.delete_vertex(next(vertex for vertex in mesh.vertices() if mesh.vertex_attributes(vertex, ["u", "v"]) == [4, 4]))
+    return mesh
+
+
+@pytest.mark.parametrize("holed", [False, True])
+def test_forces_match_the_mesh_api(grid, holed_mesh, holed):
+    mesh = holed_mesh if holed else grid(8, seed=1)
+    engine = RelaxEngine(mesh)
+    forces = engine.compute_forces(0.1)
+
+    reference = reference_forces(mesh, 0.1)
+    assert np.allclose(forces, [reference[vertex] for vertex in engine.topology.vertices], atol=1e-12)
+
+
+def test_fixed_vertices_do_not_move(grid):
+    mesh = grid(6, seed=2)
+    fixed = [7, 20]
+    for vertex in fixed:
+        mesh.vertex_attribute(vertex, "fixed", True)
+    engine = RelaxEngine(mesh)
+    before = engine.positions.copy()
+
+    engine.compute_forces(0.1)
+    engine.apply_forces()
+
+    rows = [engine.topology.index[vertex] for vertex in fixed]
+    assert np.array_equal(engine.positions[rows], before[rows])
+    assert not np.allclose(engine.positions, before)
+
+
+def test_positions_round_trip_through_the_mesh(holed_mesh):
+    engine = RelaxEngine(holed_mesh)
+    engine.positions += 1.0
+    engine.write_positions(holed_mesh)
+
+    assert np.array_equal(RelaxEngine(holed_mesh).positions, engine.positions)
+
+
+def test_topology_matches_only_the_same_connectivity(grid, holed_mesh):
+    mesh = grid(8, seed=1)
+    topology = MeshTopology(mesh)
+    assert topology.matches(mesh)
+
+    mesh.delete_face(10)
+    assert not topology.matches(mesh)
+    assert not topology.matches(holed_mesh)
+
+
+def test_rows_in_maps_vertices_to_the_rows_of_another_topology(grid, holed_mesh):
+    full = MeshTopology(grid(8, seed=1))
+    holed = MeshTopology(holed_mesh)
+
+    rows = full.rows_in(holed)
+
+    assert np.array_equal(rows >= 0, [vertex in holed.index for vertex in full.vertices])
+    kept = rows >= 0
+    assert np.array_equal(np.asarray(holed.vertices)[rows[kept]], np.asarray(full.vertices)[kept])
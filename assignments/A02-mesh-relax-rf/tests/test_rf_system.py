@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from a02_rf_system import RFSystem
+
+
+@pytest.fixture(params=["grid", "holed"])
+def make_mesh(request, grid):
+    def make_mesh():
+        mesh = grid(6, seed=8, noise=0.3)
+        if request.param == "holed":
+            # With deleted faces, Mesh.copy would return the edges in a different order.
+            for face in [7, 8, 20]:
+                mesh.delete_face(face)
+        return mesh
+
+    return make_mesh
+
+
+def rf_system(mesh, columnar: bool) -> RFSystem:
+    system = RFSystem(mesh, columnar=columnar)
+    system.create_rf_datastructure()
+    return system
+
+
+def rf_attributes(system: RFSystem) -> dict:
+    """Return the RF attributes of every edge, read through the per-edge API, as plain values."""
+    attributes = {}
+    for edge in system.mesh.edges():
+        centerline = system.edge_attribute(edge, "centerline")
+        normal = system.edge_attribute(edge, "normal")
+        attributes[edge] = (
+            [list(centerline.start), list(centerline.end)],
+            None if normal is None else list(normal),
+            system.edge_attribute(edge, "next_edge"),
+            system.edge_attribute(edge, "prev_edge"),
+        )
+    return attributes
+
+
+def assert_same_rf(system: RFSystem, reference: RFSystem) -> None:
+    attributes, expected = rf_attributes(system), rf_attributes(reference)
+    assert list(attributes) == list(expected)
+    for edge, (centerline, normal, next_edge, prev_edge) in attributes.items():
+        reference_centerline, reference_normal, reference_next, reference_prev = expected[edge]
+        assert np.allclose(centerline, reference_centerline, atol=1e-12)
+        assert (normal is None) == (reference_normal is None)
+        if normal is not None:
+            assert np.allclose(normal, reference_normal, atol=1e-12)
+        assert (next_edge, prev_edge) == (reference_next, reference_prev)
+
+
+def test_columnar_matches_dict(make_mesh):
+    assert_same_rf(rf_system(make_mesh(), columnar=True), rf_system(make_mesh(), columnar=False))
+
+
+def test_centerline_operations_match_dict(make_mesh):
+    systems = [rf_system(make_mesh(), columnar) for columnar in (False, True)]
+    edge_count = systems[0].mesh.number_of_edges()
+    eccentricities = np.random.default_rng(1).uniform(-0.1, 0.1, edge_count)
+
+    for system in systems:
+        system.eccentrize_centerlines(0.05)
+        system.eccentrize_centerlines(eccentricities)
+        system.extend_centerlines(0.1)
+        system.eccentrize_centerlines_attractor_point([3.0, 4.0, 0.0], factor=0.2, radius=5.0)
+
+    assert_same_rf(systems[1], systems[0])
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_copy_keeps_the_edge_order(make_mesh, columnar):
+    system = rf_system(make_mesh(), columnar)
+    copy = system.copy()
+
+    assert list(copy.mesh.edges()) == list(system.mesh.edges()) == copy.edge_arrays.edges
+    assert_same_rf(copy, system)
+
+    # Per-edge values are in the order of mesh.edges(), so they act on the same edges of the copy.
+    eccentricities = np.random.default_rng(2).uniform(-0.1, 0.1, system.mesh.number_of_edges())
+    copy.eccentrize_centerlines(eccentricities)
+    reference = rf_system(make_mesh(), columnar=False)
+    reference.eccentrize_centerlines(eccentricities)
+    assert_same_rf(copy, reference)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_copy_does_not_change_the_original(make_mesh, columnar):
+    system = rf_system(make_mesh(), columnar)
+    before = rf_attributes(system)
+    positions = [system.mesh.vertex_coordinates(vertex) for vertex in system.mesh.vertices()]
+
+    copy = system.copy()
+    copy.eccentrize_centerlines(0.2)
+    copy.extend_centerlines(0.1)
+    vertex = next(iter(copy.mesh.vertices()))
+    copy.mesh.vertex_attributes(vertex, "xyz", [100.0, 100.0, 100.0])
+    copy.mesh.edge_attribute(next(iter(copy.mesh.edges())), "custom", 1)
+
+    assert rf_attributes(system) == before
+    assert [system.mesh.vertex_coordinates(vertex) for vertex in system.mesh.vertices()] == positions
+    assert system.mesh.edge_attribute(next(iter(system.mesh.edges())), "custom") is None
@@ -1,3 +1,4 @@
+import numpy as np
 from compas.geometry import Point
 from compas.geometry import Vector
 
@@ -22,6 +23,12 @@ class AttractorPointModifier:
             force += attraction_force
             mesh.vertex_attribute(vertex, "force", force)
 
+    def apply_batch(self, relaxer, positions, forces, mask):
+        directions = np.array(list(self.point), dtype=float) - positions[mask]
+        lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+        unit_directions = np.divide(directions, lengths, out=np.zeros_like(directions), where=lengths > 0)
+        forces[mask] += unit_directions * self.attraction_force
+
 
 class DirectionalForceModifier:
     def __init__(self, direction: Vector, force: float):
@@ -40,3 +47,6 @@ class DirectionalForceModifier:
             directional_force = self.direction * self.force
             force += directional_force
             mesh.vertex_attribute(vertex, "force", force)
+
+    def apply_batch(self, relaxer, positions, forces, mask):
+        forces[mask] += np.array(list(self.direction), dtype=float) * self.force